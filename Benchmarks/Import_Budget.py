@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> (seconds, MB of RSS added by the import, modules that must stay unloaded).
+# Importing a module only for its storage or indicator helpers must not drag in the ML or plotting stacks
+_ML_AND_PLOTTING = ['torch', 'transformers', 'gensim', 'textblob', 'matplotlib']
+_VENDOR_SDKS = ['yfinance', 'azure']
+BUDGETS = {
+    'Data_gathering.Historical_Pricing': (1.0, 150, _ML_AND_PLOTTING + _VENDOR_SDKS),
+    'Data_gathering.News_SotialMedia': (1.0, 150, _ML_AND_PLOTTING + _VENDOR_SDKS + ['aiohttp', 'scipy']),
+    'Work_with_Data.Technical_Indicators': (1.0, 150, _ML_AND_PLOTTING + _VENDOR_SDKS),
+}
+
+# Runs in a fresh interpreter so nothing is already cached in sys.modules
+_PROBE = """
+import json, sys, time
+sys.path[:0] = {paths!r}
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+before = rss_mb()
+start = time.perf_counter()
+__import__({module!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'rss_mb': rss_mb() - before,
+                  'loaded': sorted({{name.split('.')[0] for name in sys.modules}})}}))
+"""
+
+
+def measure_import(module, repeats):
+    # Best time and smallest RSS delta over `repeats` cold interpreters, plus the top-level modules loaded
+    paths = [REPO_ROOT]
+    runs = []
+    for _ in range(repeats):
+        completed = subprocess.run([sys.executable, '-c', _PROBE.format(paths=paths, module=module)],
+                                   capture_output=True, text=True, cwd=REPO_ROOT)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {
+        'seconds': min(run['seconds'] for run in runs),
+        'rss_mb': min(run['rss_mb'] for run in runs),
+        'loaded': runs[0]['loaded'],
+    }
+
+
+def check_budgets(modules, repeats):
+    failures = []
+    for module in modules:
+        max_seconds, max_rss_mb, forbidden = BUDGETS[module]
+        result = measure_import(module, repeats)
+        problems = []
+        if result['seconds'] > max_seconds:
+            problems.append(f"{result['seconds']:.2f}s > {max_seconds}s")
+        if result['rss_mb'] > max_rss_mb:
+            problems.append(f"{result['rss_mb']:.0f} MB > {max_rss_mb} MB")
+        eager = sorted(set(forbidden) & set(result['loaded']))
+        if eager:
+            problems.append(f"eagerly imports {', '.join(eager)}")
+
+        status = 'FAIL' if problems else 'ok'
+        print(f"{status:4s} {module:40s} {result['seconds']:6.2f}s {result['rss_mb']:7.1f} MB"
+              + (f"  ({'; '.join(problems)})" if problems else ''))
+        if problems:
+            failures.append(module)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fail when importing a module exceeds its time/RSS budget.')
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS), help='modules to check (default: all)')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    unknown = [module for module in args.modules if module not in BUDGETS]
+    if unknown:
+        parser.error(f"No budget for {', '.join(unknown)}. Known: {', '.join(BUDGETS)}")
+    return 1 if check_budgets(args.modules, args.repeats) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from Data_gathering.Historical_Pricing import (CloudStorage, DataProcessor, Historical_Pricing, StorageBackend,
+                                               to_ohlcv_frame)
+from Work_with_Data.Technical_Indicators import (BollingerBands, MovingAverages, RelativeStrengthIndex,
+                                                 StreamingIndicators, TechnicalIndicatorsDataStorageManager)
+
+
+class InMemoryBackend(StorageBackend):
+    # Stand-in for blob storage: keeps payloads in a dict so uploads cost only serialization
+    def __init__(self):
+        self.blobs = {}
+
+    def upload(self, blob_name, data):
+        self.blobs[blob_name] = data
+
+    def download(self, blob_name):
+        return self.blobs.get(blob_name)
+
+    def list_blobs(self, prefix=''):
+        return sorted(name for name in self.blobs if name.startswith(prefix))
+
+    def delete(self, blob_name):
+        self.blobs.pop(blob_name, None)
+
+    def exists(self, blob_name):
+        return blob_name in self.blobs
+
+
+class SyntheticDownloader:
+    # Stand-in for yfinance: serves slices of pre-generated bars through the downloader interface
+    def __init__(self, bars_by_instrument):
+        self.bars_by_instrument = bars_by_instrument
+
+    def download_ohlcv_frames(self, instruments, start_date, end_date):
+        return {instrument: self.bars_by_instrument[instrument] for instrument in instruments}
+
+    def download_ohlcv_batch(self, instruments, start_date, end_date):
+        return {instrument: self.bars_by_instrument[instrument].to_dict(orient='records')
+                for instrument in instruments}
+
+
+def generate_ohlcv(instruments, bars, seed=0):
+    # Long frame of geometric random-walk bars: instrument, date, open, high, low, close, volume
+    rng = np.random.default_rng(seed)
+    n = instruments * bars
+    returns = rng.normal(0.0, 0.01, (instruments, bars))
+    close = 100.0 * np.exp(np.cumsum(returns, axis=1)).ravel()
+    spread = np.abs(rng.normal(0.0, 0.005, n)) * close
+    open_ = close * (1.0 + rng.normal(0.0, 0.002, n))
+    return pd.DataFrame({
+        'instrument': np.repeat([f'SYN{i:05d}' for i in range(instruments)], bars),
+        'date': np.tile(pd.bdate_range('1990-01-01', periods=bars).to_numpy(), instruments),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.integers(1, 1_000_000, n),
+    })
+
+
+def to_yahoo_frames(pricing_data):
+    # Per-instrument frames shaped like YahooFinanceDataDownloader.download_ohlcv_frame output
+    renamed = pricing_data.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low',
+                                           'close': 'Close', 'volume': 'Volume'})
+    return {instrument: to_ohlcv_frame(group.drop(columns='instrument').set_index('date'))
+            for instrument, group in renamed.groupby('instrument', sort=False)}
+
+
+def build_benchmarks(pricing_data, work_dir):
+    # name -> (zero-argument callable exercising one hot path, number of bars that call processes).
+    # Most paths take the whole synthetic universe; the incremental ones only the new batch
+    frames = to_yahoo_frames(pricing_data)
+    records = {instrument: frame.to_dict(orient='records') for instrument, frame in frames.items()}
+    cloud_storage = CloudStorage('in-memory', 'benchmarks', backend=InMemoryBackend())
+    storage_manager = TechnicalIndicatorsDataStorageManager(f'file://{work_dir}', 'benchmarks')
+
+    dates = np.sort(pricing_data['date'].unique())
+    split = dates[max(len(dates) - max(len(dates) // 100, 1), 0)]
+    existing_data = pricing_data[pricing_data['date'] < split]
+    # New batch overlaps the last existing day so drop_duplicates has real work to do
+    new_data = pricing_data[pricing_data['date'] >= dates[max(np.searchsorted(dates, split) - 1, 0)]]
+    streaming_spec = [('sma', {'window': 20}), ('bollinger', {'lookback_period': 20, 'deviation': 2}),
+                      ('ema', {'span': 12}), ('rsi', {'window': 14})]
+    streaming_state = StreamingIndicators(streaming_spec)
+    streaming_state.update_frame(existing_data.groupby('instrument').tail(20))
+    streaming_payload = streaming_state.to_json()
+
+    def upload_json():
+        for instrument, instrument_records in records.items():
+            cloud_storage.upload_blob(instrument_records, instrument, '1990-01-01')
+
+    def historical_pricing_concurrent():
+        Historical_Pricing(list(frames), None, None, '1990-01-01', '2100-01-01', None, None,
+                           max_workers=4, batch_size=25, downloader=SyntheticDownloader(frames),
+                           cloud_storage=CloudStorage('in-memory', 'benchmarks', backend=InMemoryBackend()))
+
+    def streaming_updates():
+        state = StreamingIndicators.from_json(streaming_payload)
+        storage_manager.apply_streaming_updates(state, new_data)
+
+    total_bars = len(pricing_data)
+    return {
+        'MovingAverages.sma': (lambda: MovingAverages(pricing_data).compute_simple_moving_average(20), total_bars),
+        'MovingAverages.ema': (lambda: MovingAverages(pricing_data).compute_exponential_moving_average(12),
+                               total_bars),
+        'BollingerBands': (lambda: BollingerBands(pricing_data).compute_bollinger_bands(20, 2), total_bars),
+        'RelativeStrengthIndex': (lambda: RelativeStrengthIndex(pricing_data).calculate_rsi(14, 70, 30),
+                                  total_bars),
+        'DataProcessor.validate_data': (lambda: DataProcessor().validate_data(pricing_data), total_bars),
+        'CloudStorage.upload_blob.json': (upload_json, total_bars),
+        'Historical_Pricing.concurrent': (historical_pricing_concurrent, total_bars),
+        # Concatenates and deduplicates the existing history together with the batch
+        'support_incremental_updates': (lambda: storage_manager.support_incremental_updates(existing_data, new_data),
+                                        len(existing_data) + len(new_data)),
+        'apply_streaming_updates': (streaming_updates, len(new_data)),
+    }
+
+
+def measure(function, repeats):
+    # Peak memory comes from a separate traced run so tracemalloc overhead stays out of the timings
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings, peak
+
+
+def run_suite(instrument_counts, bar_counts, repeats, max_cells, selected):
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for instruments in instrument_counts:
+            for bars in bar_counts:
+                if instruments * bars > max_cells:
+                    print(f"skip {instruments} instruments x {bars} bars (over --max-cells {max_cells})")
+                    continue
+                pricing_data = generate_ohlcv(instruments, bars)
+                for name, (function, processed_bars) in build_benchmarks(pricing_data, work_dir).items():
+                    if selected and name not in selected:
+                        continue
+                    timings, peak = measure(function, repeats)
+                    best = min(timings)
+                    result = {
+                        'benchmark': name,
+                        'instruments': instruments,
+                        'bars': bars,
+                        'total_bars': instruments * bars,
+                        'processed_bars': processed_bars,
+                        'seconds_best': best,
+                        'seconds_median': statistics.median(timings),
+                        'bars_per_second': processed_bars / best if best > 0 else None,
+                        'peak_memory_mb': peak / 2 ** 20,
+                    }
+                    results.append(result)
+                    print(f"{name:32s} {instruments:>6d} x {bars:>8d}  {best:9.4f}s  "
+                          f"{result['bars_per_second']:>14,.0f} bars/s  {result['peak_memory_mb']:9.1f} MB")
+    return results
+
+
+def environment_metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def compare_results(results, baseline_path, tolerance):
+    # Flag every benchmark whose best time grew by more than tolerance against the baseline file
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {(r['benchmark'], r['instruments'], r['bars']): r for r in baseline['results']}
+
+    regressions = []
+    for result in results:
+        before = previous.get((result['benchmark'], result['instruments'], result['bars']))
+        if before is None or not before['seconds_best']:
+            continue
+        change = result['seconds_best'] / before['seconds_best'] - 1.0
+        if change > tolerance:
+            regressions.append((result, before, change))
+            print(f"REGRESSION {result['benchmark']} {result['instruments']}x{result['bars']}: "
+                  f"{before['seconds_best']:.4f}s -> {result['seconds_best']:.4f}s (+{change:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the indicator and ingestion hot paths.')
+    parser.add_argument('--instruments', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--bars', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--max-cells', type=int, default=20_000_000,
+                        help='skip instrument x bar combinations larger than this')
+    parser.add_argument('--benchmark', action='append', help='run only the named benchmark(s)')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='previous results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against --compare before failing (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    # Per-instrument log lines would dominate the timings of the ingestion benchmarks
+    logging.basicConfig(level=logging.ERROR)
+
+    results = run_suite(args.instruments, args.bars, args.repeats, args.max_cells, args.benchmark)
+    with open(args.output, 'w') as output_file:
+        json.dump({'metadata': environment_metadata(), 'results': results}, output_file, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare and compare_results(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
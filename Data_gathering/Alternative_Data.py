@@ -1,7 +1,67 @@
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
 import requests
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
 import json
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pa_json
+from Data_gathering.Historical_Pricing import deserialize_frame, make_storage_backend, serialize_frame
+
+# Default columns of a streamed chunk: column name -> NumPy dtype
+DEFAULT_CHUNK_COLUMNS = {'timestamp': 'datetime64[ns]', 'value': 'float64'}
+
+# Partition key used for rows whose instrument or timestamp is missing
+NULL_PARTITION = '__null__'
+
+def _arrow_type(dtype):
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'M':
+        return pa.timestamp('ns')
+    if dtype.kind == 'f':
+        return pa.float64()
+    if dtype.kind in 'iu':
+        return pa.int64()
+    if dtype.kind == 'b':
+        return pa.bool_()
+    return pa.string()
+
+def _check_no_missing(name, dtype, missing):
+    # Integer and boolean arrays cannot hold a missing value, and switching the column to float for
+    # one chunk would make types drift between chunks; such columns must be declared float64
+    if missing and np.dtype(dtype).kind in 'iub':
+        raise ValueError(f"Column {name} ({dtype}) has {missing} missing values; declare it as float64 "
+                         f"to keep them as NaN.")
+
+def records_to_chunk(records: List[dict], columns: Dict[str, str]) -> Dict[str, np.ndarray]:
+    # Column-wise arrays for a list of records; absent keys become NaN / NaT / None,
+    # and are rejected in integer and boolean columns
+    chunk = {}
+    for name, dtype in columns.items():
+        values = [record.get(name) for record in records]
+        _check_no_missing(name, dtype, sum(value is None for value in values))
+        if np.dtype(dtype).kind == 'M':
+            chunk[name] = pd.to_datetime(values, utc=True).tz_localize(None).to_numpy(dtype='datetime64[ns]')
+        elif np.dtype(dtype).kind == 'f':
+            chunk[name] = np.array([np.nan if value is None else value for value in values], dtype=dtype)
+        else:
+            chunk[name] = np.array(values, dtype=dtype if np.dtype(dtype).kind != 'U' else object)
+    return chunk
+
+def ndjson_to_chunk(lines: List[bytes], columns: Dict[str, str]) -> Dict[str, np.ndarray]:
+    # Parses a block of NDJSON lines in one Arrow call against an explicit schema, so
+    # only the requested columns are materialized and types never drift between chunks
+    schema = pa.schema([(name, _arrow_type(dtype)) for name, dtype in columns.items()])
+    options = pa_json.ParseOptions(explicit_schema=schema, unexpected_field_behavior='ignore')
+    table = pa_json.read_json(pa.BufferReader(b'\n'.join(lines)), parse_options=options)
+    chunk = {}
+    for name, dtype in columns.items():
+        _check_no_missing(name, dtype, table.column(name).null_count)
+        values = table.column(name).to_numpy(zero_copy_only=False)
+        chunk[name] = values if values.dtype.kind in 'OU' else values.astype(dtype, copy=False)
+    return chunk
 
 class AlternativeDataResearcher:
     def __init__(self, target_markets: List[str], data_types: List[str]):
@@ -74,6 +134,35 @@ class AlternativeDataConnector:
 
         return response.json()
 
+    def stream_ndjson_lines(self, read_size=1024 * 1024) -> Iterator[bytes]:
+        # NDJSON endpoint read incrementally: only read_size bytes of the body are buffered at a time
+        endpoint = '/alternative-data'
+        params = {'instruments': ','.join(self.instruments), 'date_ranges': ','.join(self.date_ranges),
+                  'format': 'ndjson'}
+        headers = dict(self.headers, Accept='application/x-ndjson')
+        with self.session.get(f'{self.base_url}{endpoint}', params=params, headers=headers, stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f"Error fetching data: {response.status_code}")
+            for line in response.iter_lines(chunk_size=read_size):
+                if line:
+                    yield line
+
+    def iter_pages(self, page_size=10000) -> Iterator[List[dict]]:
+        # Paginated JSON endpoint ({'data': [...], 'next_cursor': ...}): one page in memory at a time
+        endpoint = '/alternative-data'
+        params = {'instruments': ','.join(self.instruments), 'date_ranges': ','.join(self.date_ranges),
+                  'page_size': page_size}
+        while True:
+            response = self.session.get(f'{self.base_url}{endpoint}', params=params, headers=self.headers)
+            if response.status_code != 200:
+                raise Exception(f"Error fetching data: {response.status_code}")
+            payload = response.json()
+            yield payload.get('data', [])
+            cursor = payload.get('next_cursor')
+            if not cursor:
+                return
+            params['cursor'] = cursor
+
 class AlternativeDataRetriever:
     def __init__(self, data_connector):
         self.data_connector = data_connector
@@ -96,10 +185,39 @@ class AlternativeDataRetriever:
         else:
             return []
 
+    def iter_chunks(self, chunk_size=65536, columns=None, source='ndjson', page_size=10000):
+        # Streaming counterpart of retrieve_data + reformat_data: yields {column: array} chunks of exactly
+        # chunk_size rows (the last may be shorter), so memory is bounded by one chunk plus one read buffer.
+        # source 'ndjson' reads a line-delimited response, 'pages' follows a paginated JSON endpoint
+        columns = columns or DEFAULT_CHUNK_COLUMNS
+        if source == 'ndjson':
+            lines = []
+            for line in self.data_connector.stream_ndjson_lines():
+                lines.append(line)
+                if len(lines) == chunk_size:
+                    yield ndjson_to_chunk(lines, columns)
+                    lines = []
+            if lines:
+                yield ndjson_to_chunk(lines, columns)
+        elif source == 'pages':
+            records = []
+            for page in self.data_connector.iter_pages(page_size):
+                records.extend(page)
+                while len(records) >= chunk_size:
+                    yield records_to_chunk(records[:chunk_size], columns)
+                    records = records[chunk_size:]
+            if records:
+                yield records_to_chunk(records, columns)
+        else:
+            raise ValueError("source must be 'ndjson' or 'pages'.")
+
 class AlternativeDataTransformer:
-    def __init__(self, raw_alternative_data):
+    def __init__(self, raw_alternative_data, feature_functions=None):
         self.raw_alternative_data = raw_alternative_data
         self.transformed_data = None
+        # Feature name -> function(chunk) -> array, evaluated on whole column arrays of a chunk
+        self.feature_functions = feature_functions or {
+            'feature': lambda chunk: self._calculate_feature(chunk['value'])}
 
     def engineer_features(self):
         # Implementation details for engineering meaningful features from low-level data
@@ -119,15 +237,31 @@ class AlternativeDataTransformer:
         # Replace this with your own feature engineering logic
         return value * 2
 
+    def transform_chunk(self, chunk: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        # Adds every feature column to a copy of the chunk in one vectorized call per feature
+        transformed = dict(chunk)
+        for name, feature_function in self.feature_functions.items():
+            transformed[name] = feature_function(chunk)
+        return transformed
+
+    def stream_features(self, chunks) -> Iterator[Dict[str, np.ndarray]]:
+        # Lazily transforms chunks from AlternativeDataRetriever.iter_chunks, one at a time
+        for chunk in chunks:
+            yield self.transform_chunk(chunk)
+
 
 class AlternativeDataStorageManager:
-    def __init__(self, connection_string: str, container_name: str):
+    def __init__(self, connection_string: str, container_name: str, backend=None, max_workers=8,
+                 prefix='alternative_data'):
         self.connection_string = connection_string
         self.container_name = container_name
 
-        # Establish connection with the cloud storage
-        self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
-        self.container_client = self.blob_service_client.get_container_client(self.container_name)
+        # Establish connection with the cloud storage (pooled Azure client or local filesystem)
+        self.backend = backend or make_storage_backend(self.connection_string, self.container_name)
+        self.max_workers = max_workers
+        self.prefix = prefix
+        # Metadata passed to log_metadata, recorded on the partitions of the next write_partitions run
+        self.pending_metadata = {}
 
     def serialize_feature_data(self, transformed_data):
         # Implementation details for serializing feature data to cloud storage
@@ -137,13 +271,161 @@ class AlternativeDataStorageManager:
 
     def _upload_to_cloud_storage(self, serialized_data):
         # Implementation details for uploading serialized data to cloud storage
-        # This example uses Azure Blob Storage
         blob_name = 'transformed_data.json'
-        blob_client = self.container_client.get_blob_client(blob_name)
-
-        blob_client.upload_blob(serialized_data, overwrite=True)
+        self.backend.upload(blob_name, serialized_data)
 
     def log_metadata(self, metadata: dict):
-        # Implementation details for logging important metadata like spatial resolution
-        # This can involve recording relevant information about the data in a log file or database
-        print("Metadata:", metadata)
\ No newline at end of file
+        # Metadata such as spatial resolution is kept with the data: it is stored on every partition
+        # of the next write_partitions run, in the manifest
+        self.pending_metadata.update(metadata)
+
+    def _run_manifest_name(self, data_type: str, run_id: str) -> str:
+        return f"{self.prefix}/{data_type}/_manifests/{run_id}.json"
+
+    def _load_run_manifests(self, data_type: str) -> List[tuple]:
+        # (blob name, manifest) of every committed run manifest, downloaded concurrently
+        names = sorted(self.backend.list_blobs(f"{self.prefix}/{data_type}/_manifests/"))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            payloads = list(executor.map(self.backend.download, names))
+        return [(name, json.loads(payload)) for name, payload in zip(names, payloads) if payload]
+
+    @staticmethod
+    def _merge_entries(entries: List[dict]) -> tuple:
+        # (current, superseded) partition entries. A partition key is (instrument, date): the run that
+        # committed it last replaces every earlier run's parts for that key, while all parts one run
+        # wrote for it are kept (a stream can emit the same key in several chunks)
+        def version(entry):
+            return entry['committed_at'], entry['run_id']
+
+        latest = {}
+        for entry in entries:
+            key = (entry['instrument'], entry['date'])
+            if key not in latest or version(entry) > latest[key]:
+                latest[key] = version(entry)
+        current, superseded = [], []
+        for entry in entries:
+            is_current = version(entry) == latest[(entry['instrument'], entry['date'])]
+            (current if is_current else superseded).append(entry)
+        current.sort(key=lambda entry: (entry['instrument'], entry['date'], entry['blob']))
+        return current, superseded
+
+    def load_manifest(self, data_type: str) -> dict:
+        # Every run commits its own manifest blob, so concurrent writers never overwrite each other;
+        # the dataset manifest is their merge, resolved here on read. consolidate_manifest keeps the
+        # number of blobs this has to download small
+        run_manifests = [manifest for _, manifest in self._load_run_manifests(data_type)]
+        partitions, _ = self._merge_entries([entry for manifest in run_manifests for entry in manifest['partitions']])
+        manifest = {'data_type': data_type, 'partitions': partitions}
+        if run_manifests:
+            manifest['updated_at'] = max(run_manifest['updated_at'] for run_manifest in run_manifests)
+        return manifest
+
+    def consolidate_manifest(self, data_type: str) -> dict:
+        # Folds every run manifest into a single one and deletes the run manifests and the partition
+        # blobs later runs replaced. Runs committing meanwhile keep their own manifest and are folded in
+        # next time. A read that listed the manifests before a replacing run committed may still try
+        # to fetch a replaced part, so run this outside busy read windows. Returns the merged manifest
+        run_manifests = self._load_run_manifests(data_type)
+        partitions, superseded = self._merge_entries(
+            [entry for _, manifest in run_manifests for entry in manifest['partitions']])
+        run_id = uuid.uuid4().hex[:12]
+        manifest = {'data_type': data_type, 'run_id': run_id, 'consolidated': True, 'partitions': partitions,
+                    'updated_at': datetime.now(timezone.utc).isoformat()}
+        self.backend.upload(self._run_manifest_name(data_type, run_id), json.dumps(manifest))
+        for name, _ in run_manifests:
+            self.backend.delete(name)
+        for entry in superseded:
+            self.backend.delete(entry['blob'])
+        return manifest
+
+    @staticmethod
+    def _to_frame(chunk) -> pd.DataFrame:
+        return chunk if isinstance(chunk, pd.DataFrame) else pd.DataFrame(chunk)
+
+    def write_partitions(self, chunks, data_type: str, instrument: str = None, metadata: dict = None,
+                         timestamp_column='timestamp') -> dict:
+        # Writes a frame, or an iterable of frames / column chunks (e.g. AlternativeDataTransformer.stream_features),
+        # as Parquet partitions <prefix>/<data_type>/instrument=<instrument>/date=<YYYY-MM-DD>/part-<run>-<n>.parquet.
+        # Rows are split by their own 'instrument' column when present, else tagged with `instrument`;
+        # rows with no instrument or no timestamp go to the NULL_PARTITION key instead of being dropped.
+        # Writing an (instrument, date) key again replaces what earlier runs stored for it.
+        # Uploads run concurrently with at most 2 * max_workers in flight, so a stream never buffers more
+        # than that; the run's manifest is written once, after every upload succeeded, so readers never
+        # see a half-written run. Returns the run's manifest
+        if isinstance(chunks, (pd.DataFrame, dict)):
+            chunks = [chunks]
+        run_id = uuid.uuid4().hex[:12]
+        partition_metadata = {**self.pending_metadata, **(metadata or {})}
+        entries = []
+
+        def upload(blob_name, frame, instrument_name, date):
+            self.backend.upload(blob_name, serialize_frame(frame))
+            timestamps = frame[timestamp_column]
+            return {'blob': blob_name, 'instrument': instrument_name, 'date': date, 'rows': len(frame),
+                    'min_timestamp': str(timestamps.min()), 'max_timestamp': str(timestamps.max()),
+                    'run_id': run_id, 'metadata': partition_metadata}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = set()
+            part = 0
+            for chunk in chunks:
+                frame = self._to_frame(chunk)
+                if frame.empty:
+                    continue
+                dates = pd.to_datetime(frame[timestamp_column]).dt.strftime('%Y-%m-%d').fillna(NULL_PARTITION)
+                if 'instrument' in frame.columns:
+                    instruments = frame['instrument'].astype(object).where(frame['instrument'].notna(),
+                                                                           NULL_PARTITION)
+                else:
+                    instruments = pd.Series(instrument or 'all', index=frame.index)
+                for (instrument_name, date), rows in frame.groupby([instruments, dates], sort=False,
+                                                                   dropna=False):
+                    blob_name = (f"{self.prefix}/{data_type}/instrument={instrument_name}/date={date}/"
+                                 f"part-{run_id}-{part:05d}.parquet")
+                    part += 1
+                    in_flight.add(executor.submit(upload, blob_name, rows.reset_index(drop=True),
+                                                  str(instrument_name), date))
+                    if len(in_flight) >= 2 * self.max_workers:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        entries.extend(future.result() for future in done)
+            entries.extend(future.result() for future in in_flight)
+        entries.sort(key=lambda entry: (entry['instrument'], entry['date'], entry['blob']))
+
+        # Commit time orders runs when the same partition key is written more than once
+        committed_at = datetime.now(timezone.utc).isoformat()
+        for entry in entries:
+            entry['committed_at'] = committed_at
+        manifest = {'data_type': data_type, 'run_id': run_id, 'partitions': entries, 'updated_at': committed_at}
+        # Single-blob upload under a name only this run uses: atomic on both backends (temp file + rename
+        # locally, block commit on Azure) and no read-modify-write that a concurrent run could race
+        self.backend.upload(self._run_manifest_name(data_type, run_id), json.dumps(manifest))
+        self.pending_metadata = {}
+        return manifest
+
+    def select_partitions(self, data_type: str, instruments: List[str] = None, start_date=None,
+                          end_date=None) -> List[dict]:
+        # Manifest entries for the requested instruments and inclusive date range; no data is downloaded.
+        # NULL_PARTITION dates only match when no date bound is given
+        start = pd.Timestamp(start_date).strftime('%Y-%m-%d') if start_date is not None else None
+        end = pd.Timestamp(end_date).strftime('%Y-%m-%d') if end_date is not None else None
+        wanted = set(instruments) if instruments is not None else None
+        return [entry for entry in self.load_manifest(data_type)['partitions']
+                if (wanted is None or entry['instrument'] in wanted)
+                and ((start is None and end is None) or entry['date'] != NULL_PARTITION)
+                and (start is None or entry['date'] >= start) and (end is None or entry['date'] <= end)]
+
+    def read_partitions(self, data_type: str, instruments: List[str] = None, start_date=None,
+                        end_date=None) -> pd.DataFrame:
+        # Downloads only the partitions the query needs, concurrently, and stacks them
+        entries = self.select_partitions(data_type, instruments, start_date, end_date)
+        if not entries:
+            return pd.DataFrame()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            payloads = list(executor.map(lambda entry: self.backend.download(entry['blob']), entries))
+        frames = []
+        for entry, payload in zip(entries, payloads):
+            frame = deserialize_frame(payload)
+            if 'instrument' not in frame.columns:
+                frame.insert(0, 'instrument', entry['instrument'])
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
\ No newline at end of file
@@ -1,17 +1,31 @@
+import logging
 import os
+import random
+import time
+import uuid
+import warnings
+import numpy as np
+import pandas as pd
 import requests
-from datetime import datetime
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Iterator, List
 import json
-from Historical_Pricing import DataValidator, DataStorageManager
+from requests.adapters import HTTPAdapter
+from Data_gathering.Historical_Pricing import (DataValidator, DataStorageManager, ValidationReport,
+                                               deserialize_frame, serialize_frame)
 
 
 class FundamentalDataAPIClient:
-    def __init__(self, vendor: str, base_url='https://api.vendor.com'):
+    def __init__(self, vendor: str, base_url='https://api.vendor.com', pool_size=10):
         self.api_key = os.environ.get(f'{vendor.upper()}_API_KEY')
         self.base_url = base_url
         self.session = requests.Session()
-        self.headers = {'Authorization': f'Bearer {self.api_key}'}
+        # Enough pooled keep-alive connections for every concurrent chunk request to reuse one
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.headers = {'Authorization': f'Bearer {self.api_key}', 'Accept-Encoding': 'gzip, deflate'}
 
     def initialize_api_client(self):
         if not self.authenticate():
@@ -30,10 +44,30 @@ class FundamentalDataAPIClient:
         pass
 
 
+class TransientAPIError(Exception):
+    # Worth retrying: throttling, server-side failures and dropped connections
+    pass
+
+
+class InstrumentRequestError(Exception):
+    # The vendor rejected something in the request itself (e.g. an unknown ticker): worth splitting the chunk
+    pass
+
+
 class FundamentalDataIngester:
-    def __init__(self, api_client):
+    TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+    INSTRUMENT_STATUS_CODES = {400, 404, 422}
+    AUTH_STATUS_CODES = {401, 403}
+
+    def __init__(self, api_client, chunk_size=50, max_workers=8, max_retries=4, backoff=0.5, timeout=30):
         self.api_client = api_client
         self.raw_fundamental_data = None
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.failed_instruments = {}
 
     def submit_api_request(self) -> dict:
         # Assuming the API endpoint is '/fundamentals'
@@ -50,58 +84,234 @@ class FundamentalDataIngester:
         else:
             raise Exception(f"Error fetching data: {response.status_code}")
 
+    def _request_chunk(self, instruments: List[str]) -> dict:
+        # One GET for a chunk of instruments, retried with full-jitter exponential backoff
+        # (or the server's Retry-After) on transient failures
+        endpoint = f"{self.api_client.base_url}/fundamentals"
+        params = {
+            'instruments': ','.join(instruments),
+            'fields': ','.join(self.api_client.fundamental_fields)
+        }
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.api_client.session.get(endpoint, params=params, headers=self.api_client.headers,
+                                                       timeout=self.timeout)
+                if response.status_code in self.TRANSIENT_STATUS_CODES:
+                    retry_after = response.headers.get('Retry-After')
+                    raise TransientAPIError(f"Error fetching data: {response.status_code}")
+                if response.status_code in self.INSTRUMENT_STATUS_CODES:
+                    raise InstrumentRequestError(f"Error fetching data: {response.status_code}")
+                if response.status_code in self.AUTH_STATUS_CODES:
+                    raise ValueError(f"Authentication failed ({response.status_code}). Check your API key.")
+                if response.status_code != 200:
+                    raise Exception(f"Error fetching data: {response.status_code}")
+                return response.json()
+            except (TransientAPIError, requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = float(retry_after) if retry_after and retry_after.isdigit() \
+                    else random.uniform(0, self.backoff * 2 ** attempt)
+                logging.warning(f"Retrying {len(instruments)} instruments in {delay:.2f}s: {str(e)}")
+                time.sleep(delay)
+
+    def _ingest_chunk(self, instruments: List[str]) -> List[dict]:
+        # A 400/404/422 on a multi-instrument chunk is usually one bad ticker, so the chunk is split
+        # in half until the failure is pinned to single instruments. Exhausted retries only fail the
+        # chunk; anything else (bad credentials, unexpected status) affects every chunk and is raised
+        try:
+            return self.structure_data(self._request_chunk(instruments))
+        except (InstrumentRequestError, TransientAPIError, requests.RequestException) as e:
+            if len(instruments) == 1 or not isinstance(e, InstrumentRequestError):
+                for instrument in instruments:
+                    self.failed_instruments[instrument] = str(e)
+                logging.error(f"Failed to fetch fundamentals for {instruments}: {str(e)}")
+                return []
+            middle = len(instruments) // 2
+            return self._ingest_chunk(instruments[:middle]) + self._ingest_chunk(instruments[middle:])
+
+    def iter_fundamental_records(self) -> Iterator[dict]:
+        # Chunks run concurrently over the pooled session; records are yielded as each chunk finishes,
+        # with at most max_workers chunks in flight so results never pile up in memory.
+        # Instruments that still fail end up in self.failed_instruments with the reason; an error that
+        # is not specific to the chunk (e.g. a rejected API key) is raised at once and stops the run
+        instruments = list(self.api_client.instruments)
+        chunks = iter([instruments[i:i + self.chunk_size] for i in range(0, len(instruments), self.chunk_size)])
+        self.failed_instruments = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {executor.submit(self._ingest_chunk, chunk) for chunk in
+                         (next(chunks, None) for _ in range(self.max_workers)) if chunk is not None}
+            try:
+                while in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        records = future.result()
+                        chunk = next(chunks, None)
+                        if chunk is not None:
+                            in_flight.add(executor.submit(self._ingest_chunk, chunk))
+                        yield from records
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
     def structure_data(self, raw_response: dict) -> List[dict]:
         # Assuming raw_response is a JSON with a 'data' key containing the fundamental data
         raw_data = raw_response.get('data', [])
-        
+        fields = getattr(self.api_client, 'fundamental_fields', [])
+
         structured_data = []
         for item in raw_data:
-            # Assuming 'date' is a key present in the raw data
-            structured_item = {
-                "date": item.get("date"),
-                "field1": item.get("field1"),  # Replace with actual field names
-                "field2": item.get("field2"),
-                # Add more fields as needed
-            }
+            # One record per instrument and report date, carrying every requested field
+            structured_item = {"instrument": item.get("instrument"), "date": item.get("date")}
+            structured_item.update({field: item.get(field) for field in fields})
             structured_data.append(structured_item)
-        
+
         return structured_data
 
 
 
+class FundamentalValidationReport(ValidationReport):
+    def __init__(self, total_cells, counts, issues, masks=None):
+        # issues: check name -> list of (instrument, period, field, value) for the first offending cells;
+        # masks: check name -> boolean (instrument x period x field) array for callers that want all of them
+        super().__init__(total_cells, counts, issues)
+        self.masks = masks or {}
+
+    def to_frame(self) -> pd.DataFrame:
+        rows = [(check, *issue) for check, issues in self.ranges.items() for issue in issues]
+        return pd.DataFrame(rows, columns=['check', 'instrument', 'period', 'field', 'value'])
+
+    def summary(self):
+        issues = ', '.join(f"{check}={count}" for check, count in self.counts.items() if count)
+        return f"{self.total_bars} fundamental values validated: {issues or 'no issues'}"
+
+
 class FundamentalDataValidator(DataValidator):
-    def __init__(self, fundamental_data):
-        super().__init__(fundamental_data)
+    CHECKS = ['missing_values', 'extreme_qoq_change', 'extreme_yoy_change',
+              'time_series_outliers', 'cross_section_outliers']
+    ROW_KEYS = ('instrument', 'date', 'period', 'knowledge_time', 'field', 'value')
 
-    def validate_data_contents(self):
-        missing_values = self.check_missing_values()
-        anomalies = self.identify_anomalies()
+    def __init__(self, fundamental_data, fields=None, max_abs_change=1.0, method='robust_z', threshold=5.0,
+                 percentiles=(0.5, 99.5), min_observations=8, max_issues=100):
+        # fundamental_data: records or a frame, either wide (instrument, date, one column per field)
+        # or long (instrument, date/period, field, value) like the point-in-time segments
+        super().__init__(fundamental_data, max_ranges=max_issues)
+        if method not in ('robust_z', 'percentile'):
+            raise ValueError("method must be 'robust_z' or 'percentile'.")
+        self.fields = fields
+        self.max_abs_change = max_abs_change
+        self.method = method
+        self.threshold = threshold
+        self.percentiles = percentiles
+        self.min_observations = min_observations
+
+    def _to_panel(self):
+        # Dense (instrument x period x field) float cube, NaN where nothing was reported
+        data = self.pricing_data
+        data = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        period_column = 'date' if 'date' in data.columns else 'period'
+        is_long = 'field' in data.columns and 'value' in data.columns
+        if is_long and self.fields is not None:
+            data = data[data['field'].isin(self.fields)]
+
+        instrument_codes, instruments = pd.factorize(data['instrument'], sort=True)
+        # Naive dates are taken as UTC; point-in-time segments store periods as int64 nanoseconds
+        period_codes, periods = pd.factorize(pd.to_datetime(data[period_column], utc=True).dt.tz_localize(None),
+                                             sort=True)
+        if is_long:
+            field_codes, fields = pd.factorize(data['field'], sort=True)
+            values = pd.to_numeric(data['value'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            cube = np.full((len(instruments), len(periods), len(fields)), np.nan)
+            cube[instrument_codes, period_codes, field_codes] = values
+        else:
+            fields = self.fields or [column for column in data.columns if column not in self.ROW_KEYS]
+            cube = np.full((len(instruments), len(periods), len(fields)), np.nan)
+            for f, field in enumerate(fields):
+                column = data[field] if field in data.columns else pd.Series(np.nan, index=data.index)
+                cube[instrument_codes, period_codes, f] = pd.to_numeric(column, errors='coerce').to_numpy(
+                    dtype=np.float64, na_value=np.nan)
+        return cube, np.asarray(instruments), pd.DatetimeIndex(periods), list(fields)
+
+    @staticmethod
+    def _change(cube, months, lag):
+        # Relative change against the period exactly `lag` months earlier (NaN when that period is absent)
+        target = months - lag
+        previous = np.clip(np.searchsorted(months, target), 0, len(months) - 1)
+        available = months[previous] == target
+        prior = cube[:, previous, :]
+        prior[:, ~available, :] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (cube - prior) / np.abs(prior)
+
+    def _outliers(self, values, axis):
+        # Flags values far from the rest of their slice along axis: robust z-score (median / MAD)
+        # or outside the given percentiles; slices with fewer than min_observations values are skipped
+        with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+            warnings.simplefilter('ignore', RuntimeWarning)
+            enough = (np.sum(~np.isnan(values), axis=axis, keepdims=True) >= self.min_observations)
+            if self.method == 'robust_z':
+                median = np.nanmedian(values, axis=axis, keepdims=True)
+                mad = np.nanmedian(np.abs(values - median), axis=axis, keepdims=True)
+                score = 0.6745 * (values - median) / np.where(mad > 0, mad, np.nan)
+                mask = np.abs(score) > self.threshold
+            else:
+                low, high = np.nanpercentile(values, self.percentiles, axis=axis, keepdims=True)
+                mask = (values < low) | (values > high)
+        return mask & enough
 
-        if missing_values or anomalies:
-            self.log_data_quality_issues(missing_values + anomalies)
+    def validate(self) -> FundamentalValidationReport:
+        cube, instruments, periods, fields = self._to_panel()
+        n_instruments, n_periods, _ = cube.shape
+        masks = {}
+
+        # Missing only counts inside each instrument's own coverage, so names that listed late
+        # or stopped reporting are not flagged for periods before or after they existed
+        reported = ~np.isnan(cube)
+        any_reported = reported.any(axis=2)
+        first = np.argmax(any_reported, axis=1)
+        last = n_periods - 1 - np.argmax(any_reported[:, ::-1], axis=1)
+        position = np.arange(n_periods)
+        covered = any_reported.any(axis=1)[:, None] & (position >= first[:, None]) & (position <= last[:, None])
+        masks['missing_values'] = ~reported & covered[:, :, None]
+
+        months = periods.to_numpy().astype('datetime64[M]').astype(np.int64)
+        qoq = self._change(cube, months, 3)
+        yoy = self._change(cube, months, 12)
+        masks['extreme_qoq_change'] = np.abs(qoq) > self.max_abs_change
+        masks['extreme_yoy_change'] = np.abs(yoy) > self.max_abs_change
+
+        # Outliers on YoY change (levels trend and differ in scale across names):
+        # against the instrument's own history and against the period's cross-section
+        masks['time_series_outliers'] = self._outliers(yoy, axis=1)
+        masks['cross_section_outliers'] = self._outliers(yoy, axis=0)
+
+        counts, issues = {}, {}
+        for check in self.CHECKS:
+            mask = masks[check]
+            counts[check] = int(mask.sum())
+            i, p, f = np.nonzero(mask)
+            i, p, f = i[:self.max_ranges], p[:self.max_ranges], f[:self.max_ranges]
+            issues[check] = [(instruments[a], periods[b], fields[c], cube[a, b, c]) for a, b, c in zip(i, p, f)]
+        return FundamentalValidationReport(int(cube.size), counts, issues, masks)
+
+    def validate_data_contents(self):
+        report = self.validate()
+        if not report.is_valid:
+            self.log_data_quality_issues(
+                [f"{check}: {instrument} {field} at {period} = {value}"
+                 for check, check_issues in report.ranges.items() for instrument, period, field, value in check_issues])
+        return report
 
     def check_missing_values(self) -> List[str]:
-        # Implementation details for checking missing fundamental values
-        missing_values = []
-        for record in self.pricing_data:
-            for field in self.api_client.fundamental_fields:
-                if field not in record or record[field] is None:
-                    missing_values.append(f"Missing value for {field} in record: {record}")
-        return missing_values
+        return [f"Missing value for {field} of {instrument} at {period}"
+                for instrument, period, field, _ in self.validate().ranges['missing_values']]
 
     def identify_anomalies(self) -> List[str]:
-        # Implementation details for identifying anomalies - percentiles, YoY change
-        anomalies = []
-        # Assuming 'date' and 'value' are keys in the fundamental data
-        for i in range(1, len(self.pricing_data)):
-            current_value = self.pricing_data[i].get('value')
-            previous_value = self.pricing_data[i - 1].get('value')
-            
-            if current_value is not None and previous_value is not None:
-                if current_value < previous_value:
-                    anomalies.append(f"Anomaly: {current_value} < {previous_value} at date {self.pricing_data[i].get('date')}")
-        
-        return anomalies
+        report = self.validate()
+        return [f"Anomaly ({check}): {instrument} {field} = {value} at {period}"
+                for check in self.CHECKS if check != 'missing_values'
+                for instrument, period, field, value in report.ranges[check]]
 
     def log_data_quality_issues(self, issues: List[str]):
         # Implementation details for logging data quality issues
@@ -110,19 +320,104 @@ class FundamentalDataValidator(DataValidator):
 
 
 
+class PointInTimeIndex:
+    # Bitemporal lookup per (instrument, field): every version ever seen, as (period date, knowledge time,
+    # value) with both times as int64 nanoseconds. Two sort orders give O(log n) answers to
+    # "latest period as known at T" and "period P as known at T"
+    def __init__(self):
+        self.series = {}
+
+    def add(self, frame):
+        # frame columns: instrument, field, period, knowledge_time (int64 ns), value.
+        # Only the (instrument, field) series present in frame are rebuilt
+        keys = pd.MultiIndex.from_arrays([frame['instrument'].to_numpy(dtype=object),
+                                          frame['field'].to_numpy(dtype=object)])
+        codes, uniques = pd.factorize(keys)
+        order = np.argsort(codes, kind='stable')
+        periods = frame['period'].to_numpy(dtype=np.int64)[order]
+        knowledge_times = frame['knowledge_time'].to_numpy(dtype=np.int64)[order]
+        values = frame['value'].to_numpy(dtype=np.float64)[order]
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(codes[order])) + 1, [len(order)]])
+
+        for code, start, end in zip(codes[order[bounds[:-1]]], bounds[:-1], bounds[1:]):
+            key = uniques[code]
+            current = self.series.get(key)
+            period, knowledge, value = periods[start:end], knowledge_times[start:end], values[start:end]
+            if current is not None:
+                period = np.concatenate([current['period'], period])
+                knowledge = np.concatenate([current['knowledge'], knowledge])
+                value = np.concatenate([current['value'], value])
+            self.series[key] = self._build(period, knowledge, value)
+
+    @staticmethod
+    def _build(period, knowledge, value):
+        # Knowledge order: latest[i] is the row with the greatest period among rows 0..i, the later-known
+        # row winning ties, i.e. what a reader at knowledge[i] would see as the current figure
+        order = np.lexsort((period, knowledge))
+        period, knowledge, value = period[order], knowledge[order], value[order]
+        # A row holding the running maximum period is the newest such row so far, and any row that
+        # reached an earlier, smaller maximum comes before it, so a running max of positions suffices
+        running_max = np.maximum.accumulate(period)
+        latest = np.maximum.accumulate(np.where(period == running_max, np.arange(len(order)), -1))
+
+        # Period order, knowledge within period: the version history of every single period
+        by_period = np.lexsort((knowledge, period))
+        return {'period': period, 'knowledge': knowledge, 'value': value, 'latest': latest,
+                'period_sorted': period[by_period], 'knowledge_by_period': knowledge[by_period],
+                'value_by_period': value[by_period]}
+
+    def latest_as_of(self, instrument, field, as_of):
+        # (period, value, knowledge time) of the most recent period known at as_of, or None
+        series = self.series.get((instrument, field))
+        if series is None:
+            return None
+        i = np.searchsorted(series['knowledge'], as_of, side='right') - 1
+        if i < 0:
+            return None
+        j = series['latest'][i]
+        return series['period'][j], series['value'][j], series['knowledge'][j]
+
+    def period_as_of(self, instrument, field, period, as_of):
+        # (value, knowledge time) of one period's latest version known at as_of, or None
+        series = self.series.get((instrument, field))
+        if series is None:
+            return None
+        lo = np.searchsorted(series['period_sorted'], period, side='left')
+        hi = np.searchsorted(series['period_sorted'], period, side='right')
+        i = lo + np.searchsorted(series['knowledge_by_period'][lo:hi], as_of, side='right') - 1
+        if i < lo:
+            return None
+        return series['value_by_period'][i], series['knowledge_by_period'][i]
+
+def _to_ns(timestamp):
+    timestamp = pd.Timestamp(timestamp)
+    return (timestamp.tz_convert('UTC') if timestamp.tzinfo else timestamp.tz_localize('UTC')).value
+
 class FundamentalDataStorageManager(DataStorageManager):
-    def __init__(self, connection_string: str, container_name: str, partition_key: str):
-        super().__init__(connection_string, container_name, partition_key)
+    # Record keys that describe a row rather than being fundamental fields
+    POINT_IN_TIME_KEYS = ('instrument', 'date', 'knowledge_time')
+
+    def __init__(self, connection_string: str, container_name: str, partition_key: str, backend=None,
+                 point_in_time_prefix='fundamentals_pit', refresh_interval=60.0):
+        super().__init__(connection_string, container_name, partition_key, backend)
+        # Append-only point-in-time store: immutable Parquet delta segments under point_in_time_prefix,
+        # each row one (instrument, field, period, knowledge time, value) version.
+        # Segments written by other processes are picked up at most every refresh_interval seconds
+        # (None: only on the first use and through refresh_point_in_time_index)
+        self.point_in_time_prefix = point_in_time_prefix
+        self.point_in_time_index = PointInTimeIndex()
+        self.loaded_segments = set()
+        self.refresh_interval = refresh_interval
+        self.last_refresh = None
 
     def serialize_structured_data(self, fundamental_data: List[dict], instrument: str, attribute: str):
         filename = f"{instrument}_{attribute}.json"
-        blob_client = self.container_client.get_blob_client(filename)
         
         # Convert the fundamental data into a JSON string
         fundamental_data_json_str = json.dumps(fundamental_data)
         
-        # Upload the JSON string to the cloud storage
-        blob_client.upload_blob(fundamental_data_json_str, overwrite=True)
+        # Upload the JSON string through the shared storage backend
+        self.backend.upload(filename, fundamental_data_json_str)
 
     def support_incremental_appends(self, existing_data: List[dict], new_data: List[dict]) -> List[dict]:
         # Assuming 'date' and 'value' are keys in the fundamental data
@@ -136,6 +431,113 @@ class FundamentalDataStorageManager(DataStorageManager):
         updated_data = list(existing_data_dict.values())
         
         return updated_data
+
+    def refresh_point_in_time_index(self):
+        # Reads only segments this manager has not seen yet (written by other processes since),
+        # all in one index update so each touched series is rebuilt once rather than per segment
+        deltas = []
+        segments = sorted(self.backend.list_blobs(f'{self.point_in_time_prefix}/'))
+        # Names removed by a compaction elsewhere are forgotten; their versions are already indexed
+        self.loaded_segments.intersection_update(segments)
+        for segment in segments:
+            if segment in self.loaded_segments:
+                continue
+            payload = self.download_bytes(segment)
+            if payload is not None:
+                deltas.append(deserialize_frame(payload))
+            self.loaded_segments.add(segment)
+        if deltas:
+            self.point_in_time_index.add(pd.concat(deltas, ignore_index=True))
+        self.last_refresh = time.monotonic()
+        return self.point_in_time_index
+
+    def _point_in_time_index(self):
+        # The index, refreshed first if it was never loaded or refresh_interval has passed
+        if self.last_refresh is None or (self.refresh_interval is not None
+                                         and time.monotonic() - self.last_refresh >= self.refresh_interval):
+            return self.refresh_point_in_time_index()
+        return self.point_in_time_index
+
+    def _segment_name(self, delta):
+        # Zero-padded earliest knowledge time first, so listing the prefix yields segments in knowledge order
+        return (f"{self.point_in_time_prefix}/segment-{delta['knowledge_time'].min():020d}-"
+                f"{uuid.uuid4().hex[:8]}.parquet")
+
+    def compact_point_in_time(self, min_segments=2):
+        # Rewrites every segment under the prefix as a single one and deletes the originals, so loading
+        # the store lists and downloads one blob. Segments appended after the refresh below are left alone;
+        # a reader listing mid-compaction may load a version twice, which the index tolerates.
+        # Returns the new segment name, or None when there were fewer than min_segments
+        self.refresh_point_in_time_index()
+        segments = sorted(self.loaded_segments)
+        if len(segments) < min_segments:
+            return None
+        deltas = [deserialize_frame(payload) for payload in map(self.download_bytes, segments)
+                  if payload is not None]
+        if not deltas:
+            return None
+        versions = pd.concat(deltas, ignore_index=True).drop_duplicates(ignore_index=True)
+        compacted = self._segment_name(versions)
+        self.upload_bytes(compacted, serialize_frame(versions))
+        for segment in segments:
+            self.backend.delete(segment)
+
+        self.loaded_segments.difference_update(segments)
+        self.loaded_segments.add(compacted)
+        return compacted
+
+    def append_point_in_time(self, records: List[dict], knowledge_time=None, fields=None):
+        # Records are dicts of instrument, date (the fiscal period) and field values, optionally with their
+        # own knowledge_time (e.g. the filing timestamp); otherwise knowledge_time, defaulting to now.
+        # Only versions that add or restate a value are written, as one new segment. Values must be numeric.
+        # Returns the segment name, or None when nothing changed
+        index = self._point_in_time_index()
+        default_knowledge = _to_ns(knowledge_time or datetime.now(timezone.utc))
+
+        rows = []
+        for record in records:
+            period = _to_ns(record['date'])
+            knowledge = _to_ns(record['knowledge_time']) if record.get('knowledge_time') else default_knowledge
+            record_fields = fields or [key for key in record if key not in self.POINT_IN_TIME_KEYS]
+            for field in record_fields:
+                value = record.get(field)
+                value = np.nan if value is None else float(value)
+                known = index.period_as_of(record['instrument'], field, period, knowledge)
+                if known is not None and (known[0] == value or (np.isnan(known[0]) and np.isnan(value))):
+                    continue
+                rows.append((record['instrument'], field, period, knowledge, value))
+        if not rows:
+            return None
+
+        delta = pd.DataFrame(rows, columns=['instrument', 'field', 'period', 'knowledge_time', 'value'])
+        segment = self._segment_name(delta)
+        self.upload_bytes(segment, serialize_frame(delta))
+        index.add(delta)
+        self.loaded_segments.add(segment)
+        return segment
+
+    def value_as_of(self, instrument: str, field: str, as_of, period_date=None):
+        # Value of field for instrument as it was known at as_of: the latest period by default,
+        # or a specific period_date. None when nothing was known yet
+        index = self._point_in_time_index()
+        if period_date is None:
+            found = index.latest_as_of(instrument, field, _to_ns(as_of))
+            return None if found is None else found[1]
+        found = index.period_as_of(instrument, field, _to_ns(period_date), _to_ns(as_of))
+        return None if found is None else found[0]
+
+    def as_of_frame(self, instruments: List[str], fields: List[str], as_of) -> pd.DataFrame:
+        # Cross-section for a backtest date: one row per instrument, one column per field, using only
+        # what was known at as_of; a matching <field>_period column records which period each value is from
+        index = self._point_in_time_index()
+        as_of = _to_ns(as_of)
+        frame = pd.DataFrame(index=pd.Index(instruments, name='instrument'))
+        for field in fields:
+            found = [index.latest_as_of(instrument, field, as_of) for instrument in instruments]
+            frame[field] = [np.nan if item is None else item[1] for item in found]
+            frame[f'{field}_period'] = pd.to_datetime([pd.NaT if item is None else item[0] for item in found],
+                                                      utc=True)
+        return frame
     
 '''# Set up your list of instruments and fundamental fields
 fundamental_instruments = ['AAPL', 'GOOGL', 'MSFT']
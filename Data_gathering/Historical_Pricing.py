@@ -1,15 +1,83 @@
+import abc
 import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import io
+import hashlib
+from datetime import datetime, timezone
+import numpy as np
 import pandas as pd
-import yfinance as yf
+import pyarrow as pa
+import pyarrow.parquet as pq
 import json
-from azure.storage.blob import BlobServiceClient
 
+OHLCV_FLOAT_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close']
+OHLCV_INT_COLUMNS = ['Volume']
+COLUMNAR_FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+def to_ohlcv_frame(data):
+    # Normalize a yfinance frame: keep the timestamp index and use typed float64/int64 columns
+    frame = data.dropna(how='all').copy()
+    frame.index = pd.to_datetime(frame.index)
+    frame.index.name = 'Date'
+    frame.columns.name = None
+
+    for column in OHLCV_FLOAT_COLUMNS:
+        if column in frame.columns:
+            frame[column] = frame[column].astype('float64')
+    for column in OHLCV_INT_COLUMNS:
+        if column in frame.columns:
+            frame[column] = frame[column].fillna(0).astype('int64')
+    return frame.sort_index()
+
+def serialize_frame(frame, output_format='parquet', compression='zstd'):
+    # Write any DataFrame as compressed Parquet or Arrow IPC bytes, index included
+    if output_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unsupported columnar format: {output_format}")
+
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    sink = io.BytesIO()
+    if output_format == 'parquet':
+        pq.write_table(table, sink, compression=compression)
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+def deserialize_frame(payload, output_format='parquet'):
+    # Read Parquet or Arrow IPC bytes straight back into a DataFrame with its index
+    if output_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unsupported columnar format: {output_format}")
+
+    source = pa.BufferReader(payload)
+    if output_format == 'parquet':
+        table = pq.read_table(source)
+    else:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+# OHLCV bars need nothing beyond the generic round trip; the names stay for the pricing call sites
+serialize_ohlcv_frame = serialize_frame
+deserialize_ohlcv_frame = deserialize_frame
+
+# yfinance and the Azure SDK are imported where they are used, so modules that only need the
+# frame helpers or the local backend do not pay for them at import time
 class YahooFinanceDataDownloader:
-    def __init__(self, api_key, api_secret):
+    # yf.download keeps its results in module-level state, so calls must not overlap.
+    # Parallelism inside a batch comes from yfinance's own download threads instead.
+    _download_lock = threading.Lock()
+
+    def __init__(self, api_key, api_secret, threads=True):
         self.api_key = api_key
         self.api_secret = api_secret
+        self.threads = threads
 
     def download_ohlcv_bars(self, instrument, start_date, end_date):
+        import yfinance as yf
+
         try:
             data = yf.download(instrument, start=start_date, end=end_date)
             return data.to_dict(orient='records')
@@ -17,46 +85,738 @@ class YahooFinanceDataDownloader:
             logging.error(f"Failed to download data for {instrument}: {str(e)}")
             return []
 
+    def download_ohlcv_frame(self, instrument, start_date, end_date):
+        # Columnar counterpart of download_ohlcv_bars that keeps the date index
+        return self.download_ohlcv_frames([instrument], start_date, end_date)[instrument]
+
+    def download_ohlcv_frames(self, instruments, start_date, end_date):
+        # Download several instruments with one call and split the result per instrument.
+        # Instruments missing from the response map to an empty frame; a failed multi-instrument
+        # call raises, and the loaders retry it ticker by ticker (download_with_fallback)
+        import yfinance as yf
+
+        instruments = list(instruments)
+        try:
+            with self._download_lock:
+                data = yf.download(instruments, start=start_date, end=end_date,
+                                   group_by='ticker', threads=self.threads, progress=False)
+        except Exception as e:
+            if len(instruments) > 1:
+                raise
+            logging.error(f"Failed to download data for {instruments[0]}: {str(e)}")
+            return {instruments[0]: pd.DataFrame()}
+
+        batch_data = {}
+        for instrument in instruments:
+            if isinstance(data.columns, pd.MultiIndex):
+                if instrument not in data.columns.get_level_values(0):
+                    batch_data[instrument] = pd.DataFrame()
+                    continue
+                instrument_data = data[instrument]
+            else:
+                instrument_data = data
+            batch_data[instrument] = to_ohlcv_frame(instrument_data)
+        return batch_data
+
+    def download_ohlcv_batch(self, instruments, start_date, end_date):
+        # Record-oriented batch download used by the JSON output path
+        frames = self.download_ohlcv_frames(instruments, start_date, end_date)
+        return {instrument: frame.to_dict(orient='records') for instrument, frame in frames.items()}
+
+class ValidationReport:
+    def __init__(self, total_bars, counts, ranges):
+        self.total_bars = total_bars
+        # counts: check name -> number of offending bars (or missing days)
+        # ranges: check name -> list of (instrument, first_date, last_date) for consecutive offending bars
+        self.counts = counts
+        self.ranges = ranges
+
+    @property
+    def is_valid(self):
+        return not any(self.counts.values())
+
+    def to_dict(self):
+        return {'total_bars': self.total_bars, 'counts': dict(self.counts), 'ranges': dict(self.ranges)}
+
+    def summary(self):
+        issues = ', '.join(f"{check}={count}" for check, count in self.counts.items() if count)
+        return f"{self.total_bars} bars validated: {issues or 'no issues'}"
+
+class DataValidator:
+    CHECKS = ['nonpositive_volume', 'high_below_low', 'close_outside_range',
+              'duplicate_timestamps', 'missing_trading_days', 'extreme_returns']
+
+    def __init__(self, pricing_data, max_abs_return=0.5, holidays=None, max_ranges=100):
+        # pricing_data: one OHLCV frame, a long frame with an 'instrument' column,
+        # a {instrument: frame} dict or a list of bar records
+        self.pricing_data = pricing_data
+        self.max_abs_return = max_abs_return
+        self.holidays = holidays
+        self.max_ranges = max_ranges
+
+    def _to_arrays(self):
+        data = self.pricing_data
+        if isinstance(data, dict):
+            frames = {instrument: frame for instrument, frame in data.items() if len(frame)}
+            data = pd.concat(frames, names=['instrument']).reset_index(level='instrument') if frames else pd.DataFrame()
+        elif not isinstance(data, pd.DataFrame):
+            data = pd.DataFrame(data)
+
+        columns = {str(column).lower(): column for column in data.columns}
+        arrays = {}
+        for field in ['open', 'high', 'low', 'close', 'volume']:
+            if field in columns:
+                arrays[field] = data[columns[field]].to_numpy(dtype='float64', na_value=np.nan)
+
+        if 'date' in columns:
+            arrays['date'] = pd.to_datetime(data[columns['date']]).to_numpy(dtype='datetime64[ns]')
+        elif isinstance(data.index, pd.DatetimeIndex):
+            arrays['date'] = data.index.to_numpy(dtype='datetime64[ns]')
+
+        if 'instrument' in columns:
+            codes, labels = pd.factorize(data[columns['instrument']], sort=True)
+            labels = np.asarray(labels)
+        else:
+            labels, codes = np.array(['']), np.zeros(len(data), dtype=np.int64)
+
+        # Sort by (instrument, date) once so every sequential check is a shifted comparison;
+        # data that already arrives sorted skips the sort entirely
+        dates = arrays.get('date')
+        is_sorted = bool(np.all((codes[1:] > codes[:-1]) |
+                                ((codes[1:] == codes[:-1]) & (dates is None or dates[1:] >= dates[:-1]))))
+        if not is_sorted:
+            order = np.lexsort((dates, codes)) if dates is not None else np.argsort(codes, kind='stable')
+            arrays = {field: values[order] for field, values in arrays.items()}
+            codes = codes[order]
+        return arrays, labels, codes
+
+    def _mask_to_ranges(self, mask, labels, codes, dates):
+        # Collapse runs of consecutive offending bars within one instrument into (instrument, first, last)
+        same_as_prev = np.zeros(len(mask), dtype=bool)
+        same_as_prev[1:] = mask[:-1] & (codes[1:] == codes[:-1])
+        same_as_next = np.zeros(len(mask), dtype=bool)
+        same_as_next[:-1] = mask[1:] & (codes[:-1] == codes[1:])
+
+        starts = np.flatnonzero(mask & ~same_as_prev)[:self.max_ranges]
+        ends = np.flatnonzero(mask & ~same_as_next)[:self.max_ranges]
+        positions = dates if dates is not None else np.arange(len(mask))
+        return [(labels[codes[start]], positions[start], positions[end]) for start, end in zip(starts, ends)]
+
+    def validate(self) -> ValidationReport:
+        arrays, labels, codes = self._to_arrays()
+        n = len(codes)
+        dates = arrays.get('date')
+        counts = {check: 0 for check in self.CHECKS}
+        ranges = {check: [] for check in self.CHECKS}
+        masks = {}
+
+        if 'volume' in arrays:
+            masks['nonpositive_volume'] = arrays['volume'] <= 0
+        if 'high' in arrays and 'low' in arrays:
+            masks['high_below_low'] = arrays['high'] < arrays['low']
+            if 'close' in arrays:
+                masks['close_outside_range'] = (arrays['close'] < arrays['low']) | (arrays['close'] > arrays['high'])
+
+        same_instrument = np.zeros(n, dtype=bool)
+        same_instrument[1:] = codes[1:] == codes[:-1]
+
+        if dates is not None:
+            duplicated = np.zeros(n, dtype=bool)
+            duplicated[1:] = same_instrument[1:] & (dates[1:] == dates[:-1])
+            masks['duplicate_timestamps'] = duplicated
+
+            # Business days strictly between consecutive bars of the same instrument
+            days = dates.astype('datetime64[D]')
+            gaps = np.zeros(n, dtype=np.int64)
+            if n > 1:
+                gaps[1:] = np.busday_count(days[:-1], days[1:], holidays=self.holidays or []) - 1
+            gaps = np.where(same_instrument, np.clip(gaps, 0, None), 0)
+            counts['missing_trading_days'] = int(gaps.sum())
+            ranges['missing_trading_days'] = [
+                (labels[codes[i]], dates[i - 1], dates[i]) for i in np.flatnonzero(gaps)[:self.max_ranges]
+            ]
+
+        if 'close' in arrays:
+            close = arrays['close']
+            returns = np.full(n, np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns[1:] = close[1:] / close[:-1] - 1.0
+            returns[~same_instrument] = np.nan
+            masks['extreme_returns'] = np.abs(returns) > self.max_abs_return
+
+        for check, mask in masks.items():
+            counts[check] = int(mask.sum())
+            if counts[check]:
+                ranges[check] = self._mask_to_ranges(mask, labels, codes, dates)
+
+        return ValidationReport(n, counts, ranges)
+
 class DataProcessor:
-    def validate_data(self, data):
-        for record in data:
-            if record['Volume'] == 0:
-                logging.warning(f"Invalid volume value for record: {record}")
+    def validate_data(self, data, instrument=None):
+        # One vectorized pass and one log line per call instead of a warning per bad bar
+        report = DataValidator(data).validate()
+        prefix = f"{instrument}: " if instrument else ""
+        if report.is_valid:
+            logging.debug(f"{prefix}{report.summary()}")
+        else:
+            logging.warning(f"{prefix}{report.summary()}")
+        return report
+
+class StorageBackend(abc.ABC):
+    # Minimal blob interface shared by every storage manager in the project
+    @abc.abstractmethod
+    def upload(self, blob_name, data):
+        pass
+
+    @abc.abstractmethod
+    def download(self, blob_name):
+        # Returns the blob content as bytes, or None when the blob does not exist
+        pass
+
+    @abc.abstractmethod
+    def list_blobs(self, prefix=''):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, blob_name):
+        # Removing a blob that does not exist is not an error
+        pass
+
+    @abc.abstractmethod
+    def exists(self, blob_name):
+        # Metadata-only check; never transfers the blob content
+        pass
+
+    def local_path(self, blob_name):
+        # Filesystem path of the blob when it can be memory-mapped in place, else None
+        return None
+
+class AzureBlobStorageBackend(StorageBackend):
+    # One BlobServiceClient per connection string for the whole process, so every manager
+    # and every blob reuses the same HTTP connection pool instead of paying setup per upload
+    _service_clients = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, connection_string, container_name, max_concurrency=8,
+                 max_block_size=4 * 1024 * 1024, max_single_put_size=8 * 1024 * 1024):
+        self.max_concurrency = max_concurrency
+        service_client = self._get_service_client(connection_string, max_block_size, max_single_put_size)
+        self.container_client = service_client.get_container_client(container_name)
+
+    @classmethod
+    def _get_service_client(cls, connection_string, max_block_size, max_single_put_size):
+        # Block settings are taken from the first backend created for a connection string
+        with cls._clients_lock:
+            client = cls._service_clients.get(connection_string)
+            if client is None:
+                from azure.storage.blob import BlobServiceClient
+                client = BlobServiceClient.from_connection_string(
+                    connection_string, max_block_size=max_block_size, max_single_put_size=max_single_put_size)
+                cls._service_clients[connection_string] = client
+            return client
+
+    def upload(self, blob_name, data):
+        # Payloads above max_single_put_size are split into blocks uploaded max_concurrency at a time
+        blob_client = self.container_client.get_blob_client(blob_name)
+        blob_client.upload_blob(data, overwrite=True, max_concurrency=self.max_concurrency)
+
+    def exists(self, blob_name):
+        return self.container_client.get_blob_client(blob_name).exists()
+
+    def download(self, blob_name):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            blob_client = self.container_client.get_blob_client(blob_name)
+            return blob_client.download_blob(max_concurrency=self.max_concurrency).readall()
+        except ResourceNotFoundError:
+            return None
+
+    def list_blobs(self, prefix=''):
+        return [blob.name for blob in self.container_client.list_blobs(name_starts_with=prefix or None)]
+
+    def delete(self, blob_name):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            self.container_client.delete_blob(blob_name)
+        except ResourceNotFoundError:
+            pass
+
+class LocalFileSystemBackend(StorageBackend):
+    def __init__(self, root_dir, chunk_size=1024 * 1024):
+        self.root_dir = os.path.abspath(root_dir)
+        self.chunk_size = chunk_size
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, blob_name):
+        path = os.path.abspath(os.path.join(self.root_dir, blob_name))
+        if os.path.commonpath([self.root_dir, path]) != self.root_dir:
+            raise ValueError(f"Blob name escapes the storage root: {blob_name}")
+        return path
+
+    def _chunks(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            view = memoryview(data)
+            for i in range(0, len(view), self.chunk_size):
+                yield view[i:i + self.chunk_size]
+        elif hasattr(data, 'read'):
+            for chunk in iter(lambda: data.read(self.chunk_size), b''):
+                yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+        else:
+            for chunk in data:
+                yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+    def upload(self, blob_name, data):
+        # Stream into a temp file next to the target and rename it into place, so readers
+        # only ever see the previous blob or the complete new one
+        path = self._path(blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in self._chunks(data):
+                    tmp_file.write(chunk)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def download(self, blob_name):
+        try:
+            with open(self._path(blob_name), 'rb') as blob_file:
+                return blob_file.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, blob_name):
+        return os.path.isfile(self._path(blob_name))
+
+    def local_path(self, blob_name):
+        path = self._path(blob_name)
+        return path if os.path.exists(path) else None
+
+    def delete(self, blob_name):
+        try:
+            os.remove(self._path(blob_name))
+        except FileNotFoundError:
+            pass
+
+    def list_blobs(self, prefix=''):
+        # Only the directory holding the prefix is walked, not the whole storage root
+        names = []
+        for dir_path, _, file_names in os.walk(self._path(prefix.rpartition('/')[0])):
+            for file_name in file_names:
+                if file_name.startswith('.tmp-'):
+                    continue
+                name = os.path.relpath(os.path.join(dir_path, file_name), self.root_dir).replace(os.sep, '/')
+                if name.startswith(prefix):
+                    names.append(name)
+        return sorted(names)
+
+def make_storage_backend(connection_string, container_name):
+    # 'file:///some/dir' selects the local backend (one sub-directory per container), anything else is Azure
+    if connection_string.startswith('file://'):
+        return LocalFileSystemBackend(os.path.join(connection_string[len('file://'):], container_name))
+    return AzureBlobStorageBackend(connection_string, container_name)
 
 class CloudStorage:
-    def __init__(self, connection_string, container_name):
+    def __init__(self, connection_string, container_name, backend=None):
         self.connection_string = connection_string
         self.container_name = container_name
 
         # Establish connection with the cloud storage
-        self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
-        self.container_client = self.blob_service_client.get_container_client(self.container_name)
+        self.backend = backend or make_storage_backend(self.connection_string, self.container_name)
 
     def upload_blob(self, data, instrument, date):
         try:
             filename = f"{date}_{instrument}.json"
-            blob_client = self.container_client.get_blob_client(filename)
             data_json_str = json.dumps(data)
-            blob_client.upload_blob(data_json_str, overwrite=True)
+            self.backend.upload(filename, data_json_str)
             logging.info(f"Uploaded data for {instrument} on {date}")
+            return True
         except Exception as e:
             logging.error(f"Failed to upload data for {instrument} on {date}: {str(e)}")
+            return False
+
+    def upload_frame(self, data, instrument, date, output_format='parquet'):
+        # Columnar counterpart of upload_blob: typed columns and the date index, compressed
+        try:
+            filename = f"{date}_{instrument}.{COLUMNAR_FORMATS[output_format]}"
+            payload = serialize_ohlcv_frame(data, output_format)
+            self.backend.upload(filename, payload)
+            logging.info(f"Uploaded {output_format} data for {instrument} on {date}")
+            return True
+        except Exception as e:
+            logging.error(f"Failed to upload {output_format} data for {instrument} on {date}: {str(e)}")
+            return False
+
+    def download_frame(self, instrument, date, output_format='parquet'):
+        # Read a blob written by upload_frame straight into a DataFrame
+        filename = f"{date}_{instrument}.{COLUMNAR_FORMATS[output_format]}"
+        payload = self.backend.download(filename)
+        if payload is None:
+            raise FileNotFoundError(f"No {output_format} data stored for {instrument} on {date}")
+        return deserialize_ohlcv_frame(payload, output_format)
+
+    def upload_bytes(self, blob_name, payload):
+        self.backend.upload(blob_name, payload)
+
+    def download_bytes(self, blob_name):
+        # Returns None when the blob does not exist yet
+        return self.backend.download(blob_name)
+
+    def delete_blob(self, blob_name):
+        self.backend.delete(blob_name)
+
+class DataStorageManager(CloudStorage):
+    # Generic storage manager the other data sources build on
+    def __init__(self, connection_string, container_name, partition_key=None, backend=None):
+        super().__init__(connection_string, container_name, backend)
+        self.partition_key = partition_key
+
+    def serialize_to_cloud_storage(self, data, blob_name):
+        if isinstance(data, pd.DataFrame):
+            serialized_data = data.to_json(orient='records', date_format='iso')
+        else:
+            serialized_data = json.dumps(data)
+        self.backend.upload(blob_name, serialized_data)
+
+def download_with_fallback(download, instruments, start_date, end_date):
+    # download(instruments, start, end) -> {instrument: data}. A failed batch call is retried one
+    # ticker at a time, so a bad ticker only fails itself. Returns (data, error per failed instrument)
+    try:
+        return download(instruments, start_date, end_date), {}
+    except Exception as e:
+        if len(instruments) == 1:
+            return {}, {instruments[0]: f"download error: {str(e)}"}
+        logging.error(f"Batch download failed for {instruments}, retrying one by one: {str(e)}")
+
+    data, errors = {}, {}
+    for instrument in instruments:
+        try:
+            data.update(download([instrument], start_date, end_date))
+        except Exception as e:
+            errors[instrument] = f"download error: {str(e)}"
+    return data, errors
+
+class ConcurrentPricingLoader:
+    def __init__(self, downloader, cloud_storage, data_processor=None, max_workers=8, batch_size=25,
+                 output_format='json'):
+        if max_workers <= 0 or batch_size <= 0:
+            raise ValueError("max_workers and batch_size must be greater than 0.")
+        if output_format != 'json' and output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+
+        # downloader only needs download_ohlcv_batch (or download_ohlcv_frames for columnar output),
+        # so a fake data source can be injected for offline runs.
+        # max_workers bounds both pools, but YahooFinanceDataDownloader serializes its calls on a
+        # process-wide lock: with it, batches download one at a time (each using yfinance's own
+        # threads) and max_workers only parallelizes the uploads
+        self.downloader = downloader
+        self.cloud_storage = cloud_storage
+        self.data_processor = data_processor or DataProcessor()
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.output_format = output_format
+
+    def _download(self, batch, data_start, data_end):
+        if self.output_format == 'json':
+            download = self.downloader.download_ohlcv_batch
+        else:
+            download = self.downloader.download_ohlcv_frames
+        return download_with_fallback(download, batch, data_start, data_end)
+
+    def _upload(self, raw_data, instrument, data_start):
+        if self.output_format == 'json':
+            return self.cloud_storage.upload_blob(raw_data, instrument, data_start)
+        return self.cloud_storage.upload_frame(raw_data, instrument, data_start, self.output_format)
+
+    def run(self, instruments, data_start, data_end):
+        instruments = list(instruments)
+        batches = [instruments[i:i + self.batch_size] for i in range(0, len(instruments), self.batch_size)]
+        summary = {'succeeded': [], 'failed': {}}
+
+        # Uploads run on their own pool so they overlap with the downloads still in flight
+        with ThreadPoolExecutor(max_workers=self.max_workers) as download_pool, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as upload_pool:
+            download_futures = {
+                download_pool.submit(self._download, batch, data_start, data_end): batch
+                for batch in batches
+            }
+            upload_futures = {}
+
+            for future in as_completed(download_futures):
+                batch = download_futures[future]
+                try:
+                    batch_data, errors = future.result()
+                except Exception as e:
+                    for instrument in batch:
+                        summary['failed'][instrument] = f"download error: {str(e)}"
+                    continue
+                summary['failed'].update(errors)
 
-def Historical_Pricing(instruments, api_key, api_secret, data_start, data_end, connection_string, container_name):
+                for instrument in batch:
+                    if instrument in errors:
+                        continue
+                    raw_data = batch_data.get(instrument)
+                    if raw_data is None or len(raw_data) == 0:
+                        summary['failed'][instrument] = "no data returned"
+                        continue
+
+                    self.data_processor.validate_data(raw_data, instrument)
+                    upload_future = upload_pool.submit(self._upload, raw_data, instrument, data_start)
+                    upload_futures[upload_future] = instrument
+
+            for future in as_completed(upload_futures):
+                instrument = upload_futures[future]
+                try:
+                    uploaded = future.result()
+                except Exception as e:
+                    summary['failed'][instrument] = f"upload error: {str(e)}"
+                    continue
+                if uploaded is False:
+                    summary['failed'][instrument] = "upload failed"
+                else:
+                    summary['succeeded'].append(instrument)
+
+        # Keep the summary in the same order as the requested universe
+        order = {instrument: i for i, instrument in enumerate(instruments)}
+        summary['succeeded'].sort(key=order.get)
+        summary['failed'] = dict(sorted(summary['failed'].items(), key=lambda item: order[item[0]]))
+
+        logging.info(f"Historical pricing run finished: {len(summary['succeeded'])} succeeded, "
+                     f"{len(summary['failed'])} failed")
+        for instrument, reason in summary['failed'].items():
+            logging.warning(f"Failed to load {instrument}: {reason}")
+        return summary
+
+def ohlcv_checksum(frame, decimals=6):
+    # Stable fingerprint of a window of bars; rounding keeps float noise from looking like a restatement
+    if len(frame) == 0:
+        return None
+    values = frame.reindex(columns=[c for c in OHLCV_FLOAT_COLUMNS + OHLCV_INT_COLUMNS if c in frame.columns])
+    hashed = pd.util.hash_pandas_object(values.round(decimals), index=True).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()
+
+class WatermarkManifest:
+    def __init__(self, cloud_storage, manifest_name='pricing_manifest.json'):
+        self.cloud_storage = cloud_storage
+        self.manifest_name = manifest_name
+        # instrument -> {history_start, last_bar, overlap_start, overlap_checksum, partitions}
+        self.entries = {}
+        # Partitions dropped from the entries by a restatement, deleted once the new manifest is saved
+        self.superseded = []
+
+    def load(self):
+        payload = self.cloud_storage.download_bytes(self.manifest_name)
+        self.entries = json.loads(payload) if payload else {}
+        self.superseded = []
+        return self
+
+    def save(self):
+        self.cloud_storage.upload_bytes(self.manifest_name, json.dumps(self.entries, indent=2))
+
+    def delete_superseded(self):
+        # Call after save: until then the stored manifest still points at these partitions.
+        # A restated partition can reuse an old name, so anything still listed is kept
+        live = {partition for entry in self.entries.values() for partition in entry['partitions']}
+        for partition in self.superseded:
+            if partition in live:
+                continue
+            try:
+                self.cloud_storage.delete_blob(partition)
+            except Exception as e:
+                logging.warning(f"Failed to delete superseded partition {partition}: {str(e)}")
+        self.superseded = []
+
+    def get(self, instrument):
+        return self.entries.get(instrument)
+
+    def record(self, instrument, history_start, bars, partition, overlap_bars, replace=False):
+        # bars: the most recent stored bars (at least overlap_bars of them when available)
+        entry = self.entries.get(instrument)
+        if replace or entry is None:
+            if entry is not None:
+                self.superseded.extend(entry['partitions'])
+            entry = {'history_start': history_start, 'partitions': []}
+        overlap = bars.iloc[-overlap_bars:]
+        entry['last_bar'] = bars.index[-1].isoformat()
+        entry['overlap_start'] = overlap.index[0].isoformat()
+        entry['overlap_checksum'] = ohlcv_checksum(overlap)
+        entry['partitions'].append(partition)
+        entry['updated_at'] = datetime.now(timezone.utc).isoformat()
+        self.entries[instrument] = entry
+
+class IncrementalPricingLoader:
+    def __init__(self, downloader, cloud_storage, data_processor=None, batch_size=25, overlap_bars=5,
+                 output_format='parquet', manifest_name='pricing_manifest.json'):
+        if overlap_bars <= 0:
+            raise ValueError("overlap_bars must be greater than 0.")
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Incremental mode needs a columnar format, got: {output_format}")
+
+        # downloader only needs download_ohlcv_frames, so a fake data source can be injected for offline runs
+        self.downloader = downloader
+        self.cloud_storage = cloud_storage
+        self.data_processor = data_processor or DataProcessor()
+        self.batch_size = batch_size
+        self.overlap_bars = overlap_bars
+        self.output_format = output_format
+        self.manifest = WatermarkManifest(cloud_storage, manifest_name)
+
+    def _partition_name(self, instrument, frame):
+        start = frame.index[0].strftime('%Y%m%d')
+        end = frame.index[-1].strftime('%Y%m%d')
+        return f"{instrument}/{start}_{end}.{COLUMNAR_FORMATS[self.output_format]}"
+
+    def _write_partition(self, instrument, frame):
+        partition = self._partition_name(instrument, frame)
+        self.cloud_storage.upload_bytes(partition, serialize_ohlcv_frame(frame, self.output_format))
+        return partition
+
+    def _fetch(self, instruments, start, data_end):
+        # Instruments that fail to download are logged and come back as empty frames
+        frames = {}
+        for i in range(0, len(instruments), self.batch_size):
+            batch_frames, errors = download_with_fallback(self.downloader.download_ohlcv_frames,
+                                                          instruments[i:i + self.batch_size], start, data_end)
+            frames.update(batch_frames)
+            for instrument, reason in errors.items():
+                logging.error(f"Failed to download {instrument}: {reason}")
+        return frames
+
+    def _full_load(self, instrument, frame, history_start, summary, status):
+        if len(frame) == 0:
+            summary['failed'][instrument] = "no data returned"
+            return
+        self.data_processor.validate_data(frame, instrument)
+        partition = self._write_partition(instrument, frame)
+        self.manifest.record(instrument, history_start, frame, partition, self.overlap_bars, replace=True)
+        summary[status].append(instrument)
+
+    def run(self, instruments, data_start, data_end):
+        self.manifest.load()
+        summary = {'initial': [], 'appended': [], 'restated': [], 'unchanged': [], 'failed': {}}
+
+        # Instruments sharing a fetch start go out in the same batched call; after the first run
+        # most of the universe shares one watermark, so the nightly delta is a handful of calls
+        groups = {}
+        for instrument in instruments:
+            entry = self.manifest.get(instrument)
+            start = entry['overlap_start'][:10] if entry else data_start
+            groups.setdefault(start, []).append(instrument)
+
+        restated = []
+        for start, group in groups.items():
+            frames = self._fetch(group, start, data_end)
+            for instrument in group:
+                frame = frames.get(instrument, pd.DataFrame())
+                entry = self.manifest.get(instrument)
+                try:
+                    if entry is None:
+                        self._full_load(instrument, frame, data_start, summary, 'initial')
+                        continue
+                    if len(frame) == 0:
+                        summary['failed'][instrument] = "no data returned"
+                        continue
+
+                    last_bar = pd.Timestamp(entry['last_bar'])
+                    overlap = frame[(frame.index >= pd.Timestamp(entry['overlap_start'])) & (frame.index <= last_bar)]
+                    if ohlcv_checksum(overlap) != entry['overlap_checksum']:
+                        # Splits and dividends rewrite past bars; refetch the whole history once
+                        restated.append(instrument)
+                        continue
+
+                    new_bars = frame[frame.index > last_bar]
+                    if len(new_bars) == 0:
+                        summary['unchanged'].append(instrument)
+                        continue
+
+                    self.data_processor.validate_data(new_bars, instrument)
+                    partition = self._write_partition(instrument, new_bars)
+                    self.manifest.record(instrument, entry['history_start'], pd.concat([overlap, new_bars]),
+                                         partition, self.overlap_bars)
+                    summary['appended'].append(instrument)
+                except Exception as e:
+                    summary['failed'][instrument] = str(e)
+
+        if restated:
+            by_start = {}
+            for instrument in restated:
+                by_start.setdefault(self.manifest.get(instrument)['history_start'], []).append(instrument)
+            for history_start, group in by_start.items():
+                frames = self._fetch(group, history_start, data_end)
+                for instrument in group:
+                    try:
+                        self._full_load(instrument, frames.get(instrument, pd.DataFrame()), history_start,
+                                        summary, 'restated')
+                    except Exception as e:
+                        summary['failed'][instrument] = str(e)
+
+        # The manifest is written last, so a crashed run never points at partitions that were not stored
+        self.manifest.save()
+        self.manifest.delete_superseded()
+        logging.info("Incremental pricing run finished: " +
+                     ', '.join(f"{len(value)} {key}" for key, value in summary.items()))
+        return summary
+
+    def load_history(self, instrument):
+        # Stitch the partitions listed in the manifest back into one frame
+        if not self.manifest.entries:
+            self.manifest.load()
+        entry = self.manifest.get(instrument)
+        if entry is None:
+            return pd.DataFrame()
+        frames = [deserialize_ohlcv_frame(self.cloud_storage.download_bytes(partition), self.output_format)
+                  for partition in entry['partitions']]
+        return pd.concat(frames).sort_index()
+
+def Historical_Pricing(instruments, api_key, api_secret, data_start, data_end, connection_string, container_name,
+                       max_workers=None, batch_size=25, downloader=None, cloud_storage=None, output_format='json',
+                       incremental=False):
     # Initialize logging
     logging.basicConfig(level=logging.INFO)
 
     # Initialize API client
-    brokerage_client = YahooFinanceDataDownloader(api_key, api_secret)
-    cloud_storage = CloudStorage(connection_string, container_name)
+    brokerage_client = downloader or YahooFinanceDataDownloader(api_key, api_secret)
+    cloud_storage = cloud_storage or CloudStorage(connection_string, container_name)
     data_processor = DataProcessor()
 
+    # Incremental mode: fetch only bars after each instrument's watermark and append them as a partition
+    if incremental:
+        loader = IncrementalPricingLoader(brokerage_client, cloud_storage, data_processor, batch_size=batch_size,
+                                          output_format=output_format if output_format in COLUMNAR_FORMATS else 'parquet')
+        return loader.run(instruments, data_start, data_end)
+
+    # Concurrent mode: batched downloads and overlapping uploads across max_workers threads.
+    # The default yfinance downloader runs one batch at a time (see YahooFinanceDataDownloader), so
+    # there max_workers speeds up uploads; an injected downloader without that limit gets both
+    if max_workers is not None:
+        loader = ConcurrentPricingLoader(brokerage_client, cloud_storage, data_processor,
+                                         max_workers=max_workers, batch_size=batch_size,
+                                         output_format=output_format)
+        return loader.run(instruments, data_start, data_end)
+
+    # Columnar mode: Parquet/Arrow blobs that read straight back with CloudStorage.download_frame
+    if output_format in COLUMNAR_FORMATS:
+        for instrument in instruments:
+            frame = brokerage_client.download_ohlcv_frame(instrument, data_start, data_end)
+            data_processor.validate_data(frame, instrument)
+            cloud_storage.upload_frame(frame, instrument, data_start, output_format)
+        return
+
     for instrument in instruments:
         # Download OHLCV bars
         raw_data = brokerage_client.download_ohlcv_bars(instrument, data_start, data_end)
 
         # Data validation
-        data_processor.validate_data(raw_data)
+        data_processor.validate_data(raw_data, instrument)
 
         # Upload to cloud storage
         cloud_storage.upload_blob(raw_data, instrument, data_start)
\ No newline at end of file
@@ -1,13 +1,169 @@
+import asyncio
+import random
 import requests
-from typing import List
+import bisect
+import heapq
+import io
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
 import re
 import html
-from gensim.models import Word2Vec  
-from textblob import TextBlob
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
-import torch
-from transformers import BertTokenizer, BertModel
-from Historical_Pricing import DataStorageManager
+from Data_gathering.Historical_Pricing import DataStorageManager, deserialize_frame, serialize_frame
+
+# Item fields that carry a post's publication time, in order of preference
+TIMESTAMP_FIELDS = ('timestamp', 'publishedAt', 'created_at')
+
+def item_timestamp(item):
+    return next((item[field] for field in TIMESTAMP_FIELDS if item.get(field) is not None), None)
+
+# torch, transformers, gensim, textblob, scipy and aiohttp are imported inside the code paths that use
+# them: the storage and filtering helpers here must stay cheap to import for short-lived workers
+# (Benchmarks/Import_Budget.py enforces this)
+
+# model name -> (tokenizer, model); BERT is loaded once per process and shared by every generator
+_BERT_MODELS = {}
+_BERT_MODELS_LOCK = threading.Lock()
+
+def load_bert_model(model_name='bert-base-uncased'):
+    with _BERT_MODELS_LOCK:
+        if model_name not in _BERT_MODELS:
+            from transformers import BertModel, BertTokenizerFast
+            tokenizer = BertTokenizerFast.from_pretrained(model_name)
+            model = BertModel.from_pretrained(model_name)
+            model.eval()
+            _BERT_MODELS[model_name] = (tokenizer, model)
+        return _BERT_MODELS[model_name]
+
+class AhoCorasickAutomaton:
+    # Multi-pattern automaton: one left-to-right scan finds every pattern occurrence,
+    # in time linear in the text length plus the number of matches
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+
+    def add(self, pattern, label):
+        state = 0
+        for char in pattern:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.outputs[state].append((len(pattern), label))
+
+    def build(self):
+        # Breadth-first failure links; each state inherits the outputs of its failure state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def iter_matches(self, text):
+        # Yields (start, end, label) for every occurrence
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, label in self.outputs[state]:
+                yield position - length + 1, position + 1, label
+
+class KeywordMatcher:
+    # Tickers match case-sensitively (so 'ON' is not the word 'on'); company names, aliases and
+    # keywords match case-insensitively. Matches must sit on word boundaries.
+    def __init__(self):
+        self.case_sensitive = AhoCorasickAutomaton()
+        self.case_insensitive = AhoCorasickAutomaton()
+
+    def add(self, pattern, label, case_sensitive=False):
+        if not pattern:
+            return
+        if case_sensitive:
+            self.case_sensitive.add(pattern, label)
+        else:
+            self.case_insensitive.add(pattern.lower(), label)
+
+    def build(self):
+        self.case_sensitive.build()
+        self.case_insensitive.build()
+        return self
+
+    @staticmethod
+    def _on_word_boundary(text, start, end):
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+    def find(self, text):
+        # Returns the set of labels mentioned in text
+        labels = set()
+        for scanned, automaton in ((text, self.case_sensitive), (text.lower(), self.case_insensitive)):
+            for start, end, label in automaton.iter_matches(scanned):
+                if self._on_word_boundary(scanned, start, end):
+                    labels.add(label)
+        return labels
+
+    def tag(self, text):
+        # Splits matches into (instruments, keywords), each sorted
+        labels = self.find(text or '')
+        instruments = sorted(value for kind, value in labels if kind == 'instrument')
+        keywords = sorted(value for kind, value in labels if kind == 'keyword')
+        return instruments, keywords
+
+class AsyncRateLimiter:
+    # Token bucket shared by every request to one vendor: `rate` requests per `per` seconds
+    def __init__(self, rate, per=1.0):
+        self.capacity = rate
+        self.tokens = rate
+        self.fill_rate = rate / per
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+class RecentIds:
+    # Bounded "seen" set so polling a feed forever does not grow memory
+    def __init__(self, maxlen=100000):
+        self.order = deque()
+        self.ids = set()
+        self.maxlen = maxlen
+
+    def add(self, item_id):
+        # Returns False when item_id was already seen
+        if item_id in self.ids:
+            return False
+        self.ids.add(item_id)
+        self.order.append(item_id)
+        if len(self.order) > self.maxlen:
+            self.ids.discard(self.order.popleft())
+        return True
 
 class NewsSocialMediaAPIClient:
     def __init__(self, news_api_key, social_media_api_key):
@@ -31,10 +187,70 @@ class NewsSocialMediaAPIClient:
         if response.status_code != 200:
             raise ValueError(f"Social Media API authentication failed. Error code: {response.status_code}")
 
-    def configure_instruments_keywords(self, instruments: List[str], keywords: List[str]):
+    async def _get_json(self, session, url, params, headers, rate_limiter, max_retries=5):
+        # Rate-limited GET that waits out 429/503 responses (Retry-After when the vendor sends it)
+        for attempt in range(max_retries + 1):
+            await rate_limiter.acquire()
+            async with session.get(url, params=params, headers=headers) as response:
+                if response.status in (429, 503) and attempt < max_retries:
+                    retry_after = response.headers.get('Retry-After')
+                    delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+                    await asyncio.sleep(delay + random.uniform(0, 0.5))
+                    continue
+                if response.status != 200:
+                    raise ValueError(f"Request to {url} failed. Error code: {response.status}")
+                return await response.json()
+
+    async def fetch_news_pages(self, session, rate_limiter, page_size=100, max_pages=None):
+        # Page-numbered NewsAPI search over the configured instruments and keywords
+        query = ' OR '.join(list(getattr(self, 'keywords', [])) + list(getattr(self, 'instruments', [])))
+        page, seen = 1, 0
+        while max_pages is None or page <= max_pages:
+            params = {'q': query, 'page': page, 'pageSize': page_size, 'sortBy': 'publishedAt'}
+            payload = await self._get_json(session, f'{self.news_base_url}everything', params, self.headers,
+                                           rate_limiter)
+            articles = payload.get('articles', [])
+            for article in articles:
+                yield article
+            seen += len(articles)
+            if not articles or seen >= payload.get('totalResults', seen):
+                return
+            page += 1
+
+    async def fetch_social_media_pages(self, session, rate_limiter, page_size=100, max_pages=None):
+        # Cursor-paginated social media search; stops when the API returns no next cursor
+        query = ' OR '.join(list(getattr(self, 'keywords', [])) + list(getattr(self, 'instruments', [])))
+        headers = {'Authorization': self.social_media_api_key}
+        cursor, pages = None, 0
+        while max_pages is None or pages < max_pages:
+            params = {'q': query, 'limit': page_size}
+            if cursor:
+                params['cursor'] = cursor
+            payload = await self._get_json(session, f'{self.social_media_base_url}posts', params, headers,
+                                           rate_limiter)
+            for post in payload.get('data', []):
+                yield post
+            pages += 1
+            cursor = payload.get('next_cursor')
+            if not cursor:
+                return
+
+    def configure_instruments_keywords(self, instruments: List[str], keywords: List[str],
+                                       aliases: Dict[str, List[str]] = None):
         # Implementation details for configuring instruments and keywords for filtering
-        # Set up filters or parameters for both news and social media APIs
-        pass
+        # The matcher is compiled once here and reused for every article and post.
+        # aliases maps a ticker to company names or other spellings that should tag it.
+        self.instruments = instruments
+        self.keywords = keywords
+        self.matcher = KeywordMatcher()
+        for instrument in instruments:
+            self.matcher.add(instrument, ('instrument', instrument), case_sensitive=True)
+            self.matcher.add(f'${instrument}', ('instrument', instrument), case_sensitive=False)
+            for alias in (aliases or {}).get(instrument, []):
+                self.matcher.add(alias, ('instrument', instrument))
+        for keyword in keywords:
+            self.matcher.add(keyword, ('keyword', keyword))
+        self.matcher.build()
 
 class StreamFiltering:
     def __init__(self, api_client):
@@ -47,14 +263,26 @@ class StreamFiltering:
         social_media_data = self.api_client.get_social_media_data()  # Replace with the actual method to fetch social media data
 
         # Apply keyword rules for news data
-        filtered_news = [item for item in news_data if any(keyword in item['title'] for keyword in self.api_client.keywords)]
+        filtered_news = self.tag_items(news_data, 'title')
 
         # Apply keyword rules for social media data
-        filtered_social_media = [item for item in social_media_data if any(keyword in item['text'] for keyword in self.api_client.keywords)]
+        filtered_social_media = self.tag_items(social_media_data, 'text')
 
         # Combine filtered data
         self.raw_text_streams = filtered_news + filtered_social_media
 
+    def tag_items(self, items, field):
+        # Keep items that mention an instrument or keyword, tagged with what they mention
+        matcher = self.api_client.matcher
+        tagged = []
+        for item in items:
+            instruments, keywords = matcher.tag(item.get(field))
+            if instruments or keywords:
+                item['instruments'] = instruments
+                item['matched_keywords'] = keywords
+                tagged.append(item)
+        return tagged
+
     def preprocess_text_data(self):
         # Implementation details for preprocessing text data (cleaning HTML tags, etc.)
         for item in self.raw_text_streams:
@@ -69,93 +297,849 @@ class StreamFiltering:
         # Implementation details for serializing raw text streams
         pass
 
+_END_OF_STREAM = object()
+
+class StreamingIngestionPipeline:
+    # fetch (news + social) -> filter -> HTML clean -> embed -> sentiment, each stage an asyncio task
+    # joined by bounded queues, so a slow stage pauses the ones upstream and memory stays flat
+    def __init__(self, api_client, embed_fn=None, sentiment_fn=None, queue_size=256, batch_size=32,
+                 batch_timeout=0.5, poll_interval=None, news_rate=(1, 1.0), social_media_rate=(5, 1.0),
+                 max_connections=10, page_size=100):
+        self.api_client = api_client
+        self.stream_filtering = StreamFiltering(api_client)
+        # embed_fn(texts) -> (texts x dim) matrix, sentiment_fn(texts) -> polarity per text;
+        # both run in a worker thread so the event loop keeps fetching meanwhile
+        self.embed_fn = embed_fn or EmbeddingsGenerator([]).embed_texts_with_bert
+        self.sentiment_fn = sentiment_fn or _polarity_chunk
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.poll_interval = poll_interval
+        self.news_rate = news_rate
+        self.social_media_rate = social_media_rate
+        self.max_connections = max_connections
+        self.page_size = page_size
+
+    async def _fetch(self, session, out_queue):
+        news_limiter = AsyncRateLimiter(*self.news_rate)
+        social_media_limiter = AsyncRateLimiter(*self.social_media_rate)
+        seen = RecentIds()
+
+        async def pump(pages, source_stream, id_field):
+            async for item in pages:
+                if seen.add((source_stream, item.get(id_field) or item.get('text') or item.get('title'))):
+                    item['source_stream'] = source_stream
+                    await out_queue.put(item)
+
+        completed = False
+        try:
+            while True:
+                await asyncio.gather(
+                    pump(self.api_client.fetch_news_pages(session, news_limiter, self.page_size), 'news', 'url'),
+                    pump(self.api_client.fetch_social_media_pages(session, social_media_limiter, self.page_size),
+                         'social_media', 'id'))
+                if self.poll_interval is None:
+                    break
+                await asyncio.sleep(self.poll_interval)
+            completed = True
+        finally:
+            await self._end_stage(out_queue, completed)
+
+    @staticmethod
+    async def _end_stage(out_queue, completed):
+        # Every stage forwards the end marker however it exits, so nothing downstream waits forever.
+        # After a failure the marker must not block on a full queue: queued items are dropped instead,
+        # the run is failing anyway and stream() re-raises the stage's exception
+        if completed:
+            await out_queue.put(_END_OF_STREAM)
+            return
+        while True:
+            try:
+                out_queue.put_nowait(_END_OF_STREAM)
+                return
+            except asyncio.QueueFull:
+                out_queue.get_nowait()
+
+    async def _filter_and_clean(self, in_queue, out_queue):
+        matcher = getattr(self.api_client, 'matcher', None)
+        completed = False
+        try:
+            while (item := await in_queue.get()) is not _END_OF_STREAM:
+                field = 'title' if item['source_stream'] == 'news' else 'text'
+                if matcher is not None and not self.stream_filtering.tag_items([item], field):
+                    continue
+                if 'text' not in item:
+                    item['text'] = ' '.join(filter(None, [item.get('title'), item.get('description')]))
+                item['text'] = self.stream_filtering.clean_html_tags(item['text'] or '')
+                await out_queue.put(item)
+            completed = True
+        finally:
+            await self._end_stage(out_queue, completed)
+
+    async def _next_batch(self, queue):
+        # Up to batch_size items, waiting at most batch_timeout after the first; (batch, ended)
+        item = await queue.get()
+        if item is _END_OF_STREAM:
+            return [], True
+        batch = [item]
+        deadline = asyncio.get_running_loop().time() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is _END_OF_STREAM:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _batched_stage(self, in_queue, out_queue, apply_batch):
+        ended = False
+        try:
+            while not ended:
+                batch, ended = await self._next_batch(in_queue)
+                if batch:
+                    await asyncio.to_thread(apply_batch, batch)
+                    for item in batch:
+                        await out_queue.put(item)
+        finally:
+            await self._end_stage(out_queue, ended)
+
+    def _embed_batch(self, batch):
+        embeddings = self.embed_fn([item['text'] for item in batch])
+        for item, embedding in zip(batch, embeddings):
+            item['embeddings'] = embedding
+
+    def _score_batch(self, batch):
+        for item, polarity in zip(batch, self.sentiment_fn([item['text'] for item in batch])):
+            item['sentiment'] = polarity
+
+    async def stream(self):
+        # Async generator of fully processed items; runs until the feeds are exhausted
+        # (or forever when poll_interval is set)
+        import aiohttp
+
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(4)]
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        async with aiohttp.ClientSession(connector=connector, auto_decompress=True) as session:
+            tasks = [
+                asyncio.create_task(self._fetch(session, queues[0])),
+                asyncio.create_task(self._filter_and_clean(queues[0], queues[1])),
+                asyncio.create_task(self._batched_stage(queues[1], queues[2], self._embed_batch)),
+                asyncio.create_task(self._batched_stage(queues[2], queues[3], self._score_batch)),
+            ]
+            next_item = None
+            try:
+                while True:
+                    # Wait for the next item and for the stages at once, so a stage that raises fails
+                    # the stream with its own exception instead of leaving the consumer waiting.
+                    # A pending get is kept across iterations; replacing it could drop an item
+                    if next_item is None or next_item.done():
+                        next_item = asyncio.ensure_future(queues[3].get())
+                    running = [task for task in tasks if not task.done()]
+                    await asyncio.wait([next_item, *running], return_when=asyncio.FIRST_COMPLETED)
+                    for task in tasks:
+                        if task.done() and not task.cancelled() and task.exception() is not None:
+                            raise task.exception()
+                    if not next_item.done():
+                        continue
+                    item = next_item.result()
+                    if item is _END_OF_STREAM:
+                        break
+                    yield item
+                await asyncio.gather(*tasks)
+            finally:
+                if next_item is not None:
+                    next_item.cancel()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, sink):
+        # Push every processed item to sink (a plain or async callable) as soon as it is ready
+        async for item in self.stream():
+            result = sink(item)
+            if asyncio.iscoroutine(result):
+                await result
+
+class EmbeddingCache:
+    # Persistent content-addressed embedding store: a memory-mapped float32 matrix of `capacity` slots
+    # plus a SQLite index of key -> slot with last-access times for LRU eviction.
+    # Every operation runs inside one SQLite write transaction, which also serializes access to the
+    # vector file, so worker processes on one host can share a cache directory.
+    _RETWEET_PREFIX = re.compile(r'^rt\s+@\w+:?\s*')
+
+    def __init__(self, cache_dir, dim, capacity=100000, model_id='bert-base-uncased'):
+        self.cache_dir = cache_dir
+        self.dim = dim
+        self.capacity = capacity
+        self.model_id = model_id
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.connection = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), timeout=60,
+                                          isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        vectors_path = os.path.join(cache_dir, 'vectors.f32')
+        with self._transaction() as cursor:
+            cursor.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            cursor.execute('CREATE TABLE IF NOT EXISTS entries '
+                           '(key TEXT PRIMARY KEY, slot INTEGER UNIQUE, last_access INTEGER)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_access)')
+            stored = dict(cursor.execute('SELECT name, value FROM meta').fetchall())
+            if stored:
+                if int(stored['dim']) != dim or int(stored['capacity']) != capacity:
+                    raise ValueError(f"Cache at {cache_dir} holds dim={stored['dim']}, capacity={stored['capacity']}; "
+                                     f"got dim={dim}, capacity={capacity}.")
+            else:
+                cursor.executemany('INSERT INTO meta VALUES (?, ?)',
+                                   [('dim', str(dim)), ('capacity', str(capacity)), ('next_slot', '0')])
+            if not os.path.exists(vectors_path):
+                np.memmap(vectors_path, dtype=np.float32, mode='w+', shape=(capacity, dim)).flush()
+        self.vectors = np.memmap(vectors_path, dtype=np.float32, mode='r+', shape=(capacity, dim))
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.connection.cursor()
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+    @classmethod
+    def normalize_text(cls, text):
+        # Syndicated copies and retweets differ only in case, spacing, unicode forms or an 'RT @user:' prefix
+        text = unicodedata.normalize('NFKC', text).casefold()
+        text = ' '.join(text.split())
+        return cls._RETWEET_PREFIX.sub('', text)
+
+    def key_for(self, text):
+        payload = f"{self.model_id}\0{self.normalize_text(text)}".encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, keys):
+        # Returns {key: vector} for the keys present and refreshes their LRU position
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._transaction() as cursor:
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                rows = cursor.execute(f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(chunk))})",
+                                      chunk).fetchall()
+                for key, slot in rows:
+                    found[key] = np.array(self.vectors[slot])
+            now = time.time_ns()
+            cursor.executemany('UPDATE entries SET last_access = ? WHERE key = ?', [(now, key) for key in found])
+        return found
+
+    def put_many(self, keys, vectors):
+        keys = list(keys)[-self.capacity:]
+        vectors = np.asarray(vectors, dtype=np.float32)[-self.capacity:]
+        with self._transaction() as cursor:
+            existing = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                existing.update(cursor.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+            new_keys = [key for key in dict.fromkeys(keys) if key not in existing]
+
+            # Unused slots first, then evict the least recently used entries
+            next_slot = int(cursor.execute("SELECT value FROM meta WHERE name = 'next_slot'").fetchone()[0])
+            fresh = list(range(next_slot, min(next_slot + len(new_keys), self.capacity)))
+            cursor.execute("UPDATE meta SET value = ? WHERE name = 'next_slot'", (str(next_slot + len(fresh)),))
+            evicted = cursor.execute('SELECT key, slot FROM entries ORDER BY last_access LIMIT ?',
+                                     (len(new_keys) - len(fresh),)).fetchall()
+            cursor.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key, _ in evicted])
+            self.evictions += len(evicted)
+
+            slots = dict(existing)
+            slots.update(zip(new_keys, fresh + [slot for _, slot in evicted]))
+            for key, vector in zip(keys, vectors):
+                self.vectors[slots[key]] = vector
+            self.vectors.flush()
+
+            now = time.time_ns()
+            cursor.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?)',
+                               [(key, slots[key], now) for key in dict.fromkeys(keys)])
+
+    def embed(self, texts, embed_fn):
+        # Only cache misses (deduplicated) reach embed_fn; returns a float32 (texts x dim) matrix
+        keys = [self.key_for(text) for text in texts]
+        found = self.get_many(keys)
+
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in found and key not in missing:
+                missing[key] = text
+        # A miss is a text the model actually had to embed; repeats within the batch count as hits
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        if missing:
+            computed = np.asarray(embed_fn(list(missing.values())), dtype=np.float32)
+            self.put_many(list(missing), computed)
+            found.update(zip(missing, computed))
+
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+        for position, key in enumerate(keys):
+            embeddings[position] = found[key]
+        return embeddings
+
+    def stats(self):
+        size = self.connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'size': size, 'capacity': self.capacity}
+
 class EmbeddingsGenerator:
-    def __init__(self, raw_text_streams):
+    def __init__(self, raw_text_streams, model_name='bert-base-uncased', batch_size=32, num_threads=None,
+                 max_length=512, embedding_cache=None, word2vec_model=None, word2vec_model_path=None,
+                 pooling='mean', sif_a=1e-3):
         self.raw_text_streams = raw_text_streams
         self.text_embeddings = []
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.max_length = max_length
+        # Optional EmbeddingCache; duplicates and previously seen texts then skip the model
+        self.embedding_cache = embedding_cache
+
+        # Word2Vec persists across batches: pass a model, or a path it is loaded from and saved back to
+        self.word2vec_model_path = word2vec_model_path
+        if word2vec_model is None and word2vec_model_path and os.path.exists(word2vec_model_path):
+            from gensim.models import Word2Vec
+            word2vec_model = Word2Vec.load(word2vec_model_path)
+        self.word2vec_model = word2vec_model
+        if pooling not in ('mean', 'sif'):
+            raise ValueError("pooling must be 'mean' or 'sif'.")
+        self.pooling = pooling
+        self.sif_a = sif_a
 
     def generate_text_embeddings(self):
         # Implementation details for generating text embeddings using techniques like Word2Vec, BERT, etc.
         word2vec_embeddings = self.generate_word2vec_embeddings()
         bert_embeddings = self.generate_bert_embeddings()
 
-        # Combine or choose one of the embeddings based on your preference
-        self.text_embeddings = word2vec_embeddings + bert_embeddings
+        # Both are fixed-width float32 matrices, so each text gets one concatenated vector
+        self.text_embeddings = np.hstack([word2vec_embeddings, bert_embeddings])
 
     def generate_word2vec_embeddings(self):
         # Implementation details for generating Word2Vec embeddings
         sentences = [item['text'].split() for item in self.raw_text_streams]
-        model = Word2Vec(sentences, vector_size=100, window=5, min_count=1, workers=4)
-        word2vec_embeddings = [model.wv[item['text'].split()] for item in self.raw_text_streams]
-        return word2vec_embeddings
+        self.update_word2vec_model(sentences)
+        return self.pool_document_vectors(sentences)
+
+    def update_word2vec_model(self, sentences):
+        # Continue training the persistent model on the new sentences only, so the cost
+        # scales with the batch rather than with everything seen so far
+        sentences = [sentence for sentence in sentences if sentence]
+        if not sentences:
+            return self.word2vec_model
+        if self.word2vec_model is None:
+            from gensim.models import Word2Vec
+            self.word2vec_model = Word2Vec(sentences, vector_size=100, window=5, min_count=1, workers=4)
+        else:
+            self.word2vec_model.build_vocab(sentences, update=True)
+            self.word2vec_model.train(sentences, total_examples=len(sentences), epochs=self.word2vec_model.epochs)
+        if self.word2vec_model_path:
+            self.word2vec_model.save(self.word2vec_model_path)
+        return self.word2vec_model
+
+    def pool_document_vectors(self, sentences):
+        # One fixed-width float32 vector per document: the mean of its word vectors, or the SIF-weighted
+        # mean (weight a / (a + p(word))) that down-weights frequent words. Unknown or empty -> zeros.
+        if self.word2vec_model is None:
+            raise ValueError("Word2Vec model has not been trained yet.")
+        wv = self.word2vec_model.wv
+        documents = np.zeros((len(sentences), wv.vector_size), dtype=np.float32)
+
+        token_ids, doc_ids = [], []
+        for doc_id, sentence in enumerate(sentences):
+            ids = [wv.key_to_index[word] for word in sentence if word in wv.key_to_index]
+            token_ids.extend(ids)
+            doc_ids.extend([doc_id] * len(ids))
+        if not token_ids:
+            return documents
+        token_ids = np.asarray(token_ids)
+        doc_ids = np.asarray(doc_ids)
+
+        if self.pooling == 'sif':
+            # gensim keeps every word's corpus count in one array, indexed like wv.vectors
+            counts = np.asarray(wv.expandos['count'][:len(wv)], dtype=np.float64)
+            weights = (self.sif_a / (self.sif_a + counts / counts.sum()))[token_ids]
+        else:
+            weights = np.ones(len(token_ids))
+
+        # Tokens are already grouped by document, so each document is one reduceat segment
+        starts = np.flatnonzero(np.r_[True, doc_ids[1:] != doc_ids[:-1]])
+        present = doc_ids[starts]
+        weighted = wv.vectors[token_ids] * weights[:, None]
+        documents[present] = np.add.reduceat(weighted, starts, axis=0) / np.add.reduceat(weights, starts)[:, None]
+        return documents
 
     def generate_bert_embeddings(self):
         # Implementation details for generating BERT embeddings
-        tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-        model = BertModel.from_pretrained('bert-base-uncased')
+        # Returns one contiguous float32 matrix, one pooled vector per text in input order
+        texts = [item['text'] for item in self.raw_text_streams]
+        if self.embedding_cache is not None:
+            return self.embedding_cache.embed(texts, self.embed_texts_with_bert)
+        return self.embed_texts_with_bert(texts)
 
-        bert_embeddings = []
+    def embed_texts_with_bert(self, texts):
+        import torch
 
-        for item in self.raw_text_streams:
-            inputs = tokenizer(item['text'], return_tensors="pt")
-            outputs = model(**inputs)
-            pooled_output = outputs.pooler_output
-            bert_embeddings.append(pooled_output.detach().numpy())
+        tokenizer, model = load_bert_model(self.model_name)
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+
+        embeddings = np.empty((len(texts), model.config.hidden_size), dtype=np.float32)
+        if not texts:
+            return embeddings
 
-        return bert_embeddings
+        # Tokenize once, then batch texts of similar token length so padding stays minimal
+        encodings = tokenizer(texts, truncation=True, max_length=self.max_length)['input_ids']
+        order = np.argsort([len(ids) for ids in encodings], kind='stable')
+
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch_positions = order[start:start + self.batch_size]
+                batch = tokenizer.pad({'input_ids': [encodings[i] for i in batch_positions]}, return_tensors='pt')
+                outputs = model(input_ids=batch['input_ids'], attention_mask=batch['attention_mask'])
+                embeddings[batch_positions] = outputs.pooler_output.numpy()
+
+        return embeddings
 
     def output_text_embeddings(self):
         # Implementation details for serializing text embeddings
         pass
 
+def load_emotion_lexicon(path):
+    # Tab-separated `word<TAB>emotion<TAB>weight` lines, the layout both NRC lexicons ship in
+    lexicon = {}
+    with open(path, encoding='utf-8') as lexicon_file:
+        for line in lexicon_file:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) != 3:
+                continue
+            word, emotion, weight = parts
+            try:
+                weight = float(weight)
+            except ValueError:
+                continue
+            if weight:
+                lexicon.setdefault(word.lower(), {})[emotion] = weight
+    return lexicon
+
+class SentimentRollup:
+    # Additive statistics per (instrument, bucket start), so folding in new posts only touches
+    # the buckets they land in. Bucket starts are naive UTC, the same convention as the OHLCV bars
+    STATISTICS = ['count', 'polarity_sum', 'weight_sum', 'weighted_polarity_sum', 'decayed_intensity']
+
+    def __init__(self, freq='1h', half_life=None):
+        self.freq = freq
+        self.bucket_length = pd.Timedelta(freq)
+        # Intensity decays towards the bucket end; by default it halves over one bucket length
+        self.half_life = pd.Timedelta(half_life) if half_life is not None else self.bucket_length
+        self.buckets = {}
+
+    def update(self, instruments, timestamps, polarity, intensity=None, weights=None):
+        # Returns the rows of every bucket this batch touched, already merged with earlier batches
+        timestamps = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).tz_convert(None)
+        polarity = np.asarray(polarity, dtype=np.float64)
+        intensity = np.abs(polarity) if intensity is None else np.asarray(intensity, dtype=np.float64)
+        weights = np.ones(len(polarity)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+        starts = timestamps.floor(self.freq)
+        age = np.asarray((starts + self.bucket_length - timestamps) / self.half_life, dtype=np.float64)
+        batch = pd.DataFrame({'instrument': np.asarray(instruments, dtype=object), 'date': starts,
+                              'count': 1.0, 'polarity_sum': polarity, 'weight_sum': weights,
+                              'weighted_polarity_sum': weights * polarity,
+                              'decayed_intensity': intensity * np.exp2(-age)})
+        partial = batch.groupby(['instrument', 'date'], sort=False)[self.STATISTICS].sum()
+        for key, values in zip(partial.index, partial.to_numpy()):
+            current = self.buckets.get(key)
+            self.buckets[key] = values if current is None else current + values
+        return self._frame(list(partial.index))
+
+    def _frame(self, keys):
+        statistics = np.array([self.buckets[key] for key in keys], dtype=np.float64).reshape(-1, len(self.STATISTICS))
+        count, polarity_sum, weight_sum, weighted_polarity_sum, decayed_intensity = statistics.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame = pd.DataFrame({
+                'instrument': [key[0] for key in keys],
+                'date': pd.DatetimeIndex([key[1] for key in keys]),
+                'count': count.astype(np.int64),
+                'mean_polarity': polarity_sum / count,
+                'volume_weighted_polarity': np.where(weight_sum > 0, weighted_polarity_sum / weight_sum, np.nan),
+                'decayed_intensity': decayed_intensity,
+            })
+        return frame.sort_values(['instrument', 'date'], ignore_index=True)
+
+    def to_frame(self):
+        return self._frame(list(self.buckets))
+
+def _polarity_chunk(texts):
+    from textblob import TextBlob
+    return np.array([TextBlob(text).sentiment.polarity for text in texts], dtype=np.float64)
+
 class SentimentAnalysis:
-    def __init__(self, text_embeddings):
+    _TOKEN_PATTERN = re.compile(r"[a-z][a-z']*")
+
+    def __init__(self, text_embeddings, lexicon=None, max_workers=None, chunk_size=2000):
         self.text_embeddings = text_embeddings
-        self.sentiment_scores = []
+        self.sentiment_scores = np.empty(0)
+        self.emotion_intensities = np.empty((0, 0))
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+        # Lexicon as a sparse (word x emotion) weight matrix; only lexicon words get a column
+        # in the document-term matrix, everything else just counts towards document length.
+        # There is no default lexicon: without one, polarity still works but emotion intensity is unavailable
+        from scipy import sparse
+
+        self.lexicon = lexicon
+        lexicon = lexicon or {}
+        self.emotions = sorted({emotion for weights in lexicon.values() for emotion in weights})
+        self.vocabulary = {word: column for column, word in enumerate(lexicon)}
+        emotion_columns = {emotion: column for column, emotion in enumerate(self.emotions)}
+        rows, columns, values = [], [], []
+        for word, weights in lexicon.items():
+            for emotion, weight in weights.items():
+                rows.append(self.vocabulary[word])
+                columns.append(emotion_columns[emotion])
+                values.append(weight)
+        self.lexicon_weights = sparse.csr_matrix((values, (rows, columns)),
+                                                 shape=(len(self.vocabulary), len(self.emotions)))
+
+    def _texts(self):
+        return [item['text'] for item in self.text_embeddings]
 
     def classify_sentiment(self):
-        # Implementation details for classifying sentiment of posts as positive/negative
-        # Using TextBlob for sentiment analysis
-        sentiment_scores = [TextBlob(item['text']).sentiment.polarity for item in self.text_embeddings]
-        self.sentiment_scores = sentiment_scores
+        # TextBlob polarity in [-1, 1] per item, as an array aligned with text_embeddings.
+        # Items are independent, so chunks of them spread across processes
+        texts = self._texts()
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        if self.max_workers == 1 or len(chunks) <= 1:
+            scores = [_polarity_chunk(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                scores = list(pool.map(_polarity_chunk, chunks))
+        self.sentiment_scores = np.concatenate(scores) if scores else np.empty(0)
+        return self.sentiment_scores
+
+    def document_term_matrix(self, texts):
+        # (documents x lexicon words) sparse counts plus the token count of every document
+        from scipy import sparse
+
+        indptr, indices = [0], []
+        token_counts = np.empty(len(texts), dtype=np.int64)
+        vocabulary = self.vocabulary
+        for row, text in enumerate(texts):
+            tokens = self._TOKEN_PATTERN.findall(text.lower())
+            token_counts[row] = len(tokens)
+            indices.extend(vocabulary[token] for token in tokens if token in vocabulary)
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(texts), len(vocabulary)))
+        matrix.sum_duplicates()
+        return matrix, token_counts
 
     def quantify_intensity_of_emotion(self):
-        # Implementation details for quantifying intensity of emotion using lexicons
-        # Placeholder implementation; you may use more advanced methods based on your requirements
-        pass
+        # (items x emotions) array, columns ordered as self.emotions: lexicon weight mass per token
+        if not self.lexicon:
+            raise ValueError("Emotion intensity needs a lexicon, e.g. SentimentAnalysis(..., "
+                             "lexicon=load_emotion_lexicon(path)).")
+        document_terms, token_counts = self.document_term_matrix(self._texts())
+        weighted = (document_terms @ self.lexicon_weights).toarray()
+        self.emotion_intensities = weighted / np.maximum(token_counts, 1)[:, None]
+        return self.emotion_intensities
 
-    def output_timeseries_sentiment_scores(self):
-        # Implementation details for serializing timeseries sentiment scores
-        pass
+    def output_timeseries_sentiment_scores(self, rollups=None, freqs=('1min', '1h', '1D'), weight_field='engagement'):
+        # Folds the scored items into per-instrument bucketed series, one SentimentRollup per frequency.
+        # Pass the rollups from the previous batch back in to keep the series incremental. Returns
+        # {freq: rows of the buckets this batch touched}; rollup.to_frame() gives the full series.
+        # Items need 'instruments' (see StreamFiltering.tag_items) and a timestamp; a post naming
+        # several instruments counts towards each of them
+        if len(self.sentiment_scores) != len(self.text_embeddings):
+            self.classify_sentiment()
+        self.rollups = rollups if rollups is not None else {freq: SentimentRollup(freq) for freq in freqs}
+
+        positions, instruments, timestamps = [], [], []
+        for position, item in enumerate(self.text_embeddings):
+            timestamp = item_timestamp(item)
+            if timestamp is None:
+                continue
+            for instrument in item.get('instruments', ()):
+                positions.append(position)
+                instruments.append(instrument)
+                timestamps.append(timestamp)
+        positions = np.asarray(positions, dtype=np.int64)
+
+        if len(self.emotion_intensities) == len(self.text_embeddings) and self.emotion_intensities.size:
+            intensity = self.emotion_intensities.sum(axis=1)[positions]
+        else:
+            intensity = np.abs(self.sentiment_scores[positions])
+        # Only a missing weight defaults to 1; an engagement of 0 stays 0
+        weights = [self.text_embeddings[position].get(weight_field) for position in positions]
+        weights = np.array([1.0 if weight is None else float(weight) for weight in weights])
+
+        return {freq: rollup.update(instruments, timestamps, self.sentiment_scores[positions], intensity, weights)
+                for freq, rollup in self.rollups.items()}
+
+class MinHashLSHIndex:
+    # Exact (sha256 of normalized text) and near-duplicate (MinHash over word shingles, banded LSH)
+    # lookup for the most recent max_documents items; lookups cost O(shingles), not O(history)
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self, num_perm=128, bands=16, shingle_size=3, threshold=0.8, max_documents=100000, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.max_documents = max_documents
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # Coefficients span the whole field so a * x + b wraps; with small coefficients the hash
+        # would be monotone in x and every permutation would pick the same shingle
+        self.a = rng.integers(1, self._PRIME, num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, self._PRIME, num_perm, dtype=np.uint64)[:, None]
+        self.next_id = 0
+        self.order = deque()
+        self.signatures = {}
+        self.digests = {}
+        self.exact = {}
+        self.buckets = [dict() for _ in range(bands)]
+
+    def signature(self, text):
+        words = EmbeddingCache.normalize_text(text).lower().split()
+        k = min(self.shingle_size, max(len(words), 1))
+        shingles = {' '.join(words[i:i + k]) for i in range(max(len(words) - k + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = ((self.a * hashes + self.b) % self._PRIME) & np.uint64(0xFFFFFFFF)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def is_duplicate(self, text):
+        # (duplicate?, digest, signature) so add() can reuse the work done by the lookup
+        digest = hashlib.sha256(EmbeddingCache.normalize_text(text).encode('utf-8')).hexdigest()
+        if digest in self.exact:
+            return True, digest, None
+        signature = self.signature(text)
+        candidates = set()
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        for doc_id in candidates:
+            if np.mean(self.signatures[doc_id] == signature) >= self.threshold:
+                return True, digest, signature
+        return False, digest, signature
+
+    def add(self, digest, signature):
+        doc_id = self.next_id
+        self.next_id += 1
+        self.order.append(doc_id)
+        self.signatures[doc_id] = signature
+        self.digests[doc_id] = digest
+        self.exact[digest] = doc_id
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            bucket.setdefault(key, set()).add(doc_id)
+        while len(self.order) > self.max_documents:
+            self._evict(self.order.popleft())
+
+    def _evict(self, doc_id):
+        signature = self.signatures.pop(doc_id)
+        digest = self.digests.pop(doc_id)
+        if self.exact.get(digest) == doc_id:
+            del self.exact[digest]
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            members = bucket[key]
+            members.discard(doc_id)
+            if not members:
+                del bucket[key]
+
+    def add_if_new(self, text):
+        duplicate, digest, signature = self.is_duplicate(text)
+        if not duplicate:
+            self.add(digest, signature)
+        return not duplicate
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        ids = np.fromiter(self.order, dtype=np.int64, count=len(self.order))
+        np.savez_compressed(
+            buffer,
+            params=np.array([self.num_perm, self.bands, self.shingle_size, self.max_documents, self.seed,
+                             self.next_id], dtype=np.int64),
+            threshold=np.array(self.threshold),
+            ids=ids,
+            signatures=np.array([self.signatures[i] for i in ids], dtype=np.uint32).reshape(-1, self.num_perm),
+            digests=np.array([self.digests[i] for i in ids], dtype='U64'))
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload):
+        stored = np.load(io.BytesIO(payload))
+        num_perm, bands, shingle_size, max_documents, seed, next_id = (int(v) for v in stored['params'])
+        index = cls(num_perm, bands, shingle_size, float(stored['threshold']), max_documents, seed)
+        for doc_id, signature, digest in zip(stored['ids'], stored['signatures'], stored['digests']):
+            index.next_id = int(doc_id)
+            index.add(str(digest), signature)
+        index.next_id = next_id
+        return index
+
+class _FrameRecords:
+    # Read-only list view of a DataFrame's rows as dicts; only the rows actually accessed are converted
+    def __init__(self, frame):
+        self.frame = frame
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.frame.iloc[key].to_dict(orient='records')
+        return self.frame.iloc[key].to_dict()
 
 class NewsSocialMediaStorageManager:
-    def __init__(self, connection_string, container_name):
+    def __init__(self, connection_string, container_name, dedup_index_name='stream_dedup_index.npz',
+                 dedup_index=None):
         self.connection_string = connection_string
         self.container_name = container_name
         self.historical_storage_manager = DataStorageManager(connection_string, container_name)
+        self.dedup_index_name = dedup_index_name
+        self.dedup_index = dedup_index
+        self._dedup_index_needs_seed = False
+
+    EMBEDDING_FORMATS = ['npy', 'json']
+
+    def serialize_text_embeddings(self, text_embeddings, source_stream, output_format='npy', dtype=np.float32):
+        # 'npy' writes the vectors as one (items x dim) .npy block in dtype (float32 or float16)
+        # next to a Parquet sidecar of text / source_stream / timestamp, row i describing vector i.
+        # 'json' keeps the old JSON-lines layout for existing consumers
+        if output_format not in self.EMBEDDING_FORMATS:
+            raise ValueError(f"Unsupported embedding format: {output_format}. Expected one of {self.EMBEDDING_FORMATS}.")
+        storage = self.historical_storage_manager
+
+        if output_format == 'json':
+            embeddings_df = pd.DataFrame({'text': [item['text'] for item in text_embeddings],
+                                          'embeddings': [item['embeddings'] for item in text_embeddings],
+                                          'source_stream': source_stream})
+            storage.backend.upload(f"{source_stream}_text_embeddings.json",
+                                   embeddings_df.to_json(orient='records', lines=True))
+            return
+
+        if len(text_embeddings) == 0:
+            # An empty batch still replaces the stored one, as a (0 x 0) block and an empty sidecar
+            vectors = np.empty((0, 0), dtype=dtype)
+        else:
+            vectors = np.asarray([item['embeddings'] for item in text_embeddings], dtype=dtype)
+        if vectors.ndim != 2:
+            raise ValueError("Every embedding must be a vector of the same length.")
+        timestamps = [item_timestamp(item) for item in text_embeddings]
+        sidecar = pd.DataFrame({'text': [item['text'] for item in text_embeddings],
+                                'source_stream': source_stream,
+                                'timestamp': pd.to_datetime(timestamps, utc=True)})
+
+        buffer = io.BytesIO()
+        np.save(buffer, vectors)
+        storage.upload_bytes(f"{source_stream}_text_embeddings.npy", buffer.getvalue())
+        storage.upload_bytes(f"{source_stream}_text_embeddings.parquet", serialize_frame(sidecar))
+
+    def load_text_embeddings(self, source_stream, cache_dir=None):
+        # (vectors, sidecar) with vectors memory-mapped read-only: straight from disk on the local
+        # backend, otherwise after one download into cache_dir. Returns (None, None) if never written.
+        # Cached copies live under the container and are named by content hash, so containers never
+        # share a file and a newer upload never rewrites a file another reader has mapped
+        storage = self.historical_storage_manager
+        vectors_name = f"{source_stream}_text_embeddings.npy"
+        path = storage.backend.local_path(vectors_name)
+        if path is None:
+            payload = storage.download_bytes(vectors_name)
+            if payload is None:
+                return None, None
+            cache_dir = os.path.join(cache_dir or os.path.join(tempfile.gettempdir(), 'text_embeddings'),
+                                     self.container_name)
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, f"{hashlib.sha256(payload).hexdigest()[:16]}_{vectors_name}")
+            if not os.path.exists(path):
+                # Written under a temporary name and renamed, so a concurrent reader never maps a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.tmp-')
+                try:
+                    with os.fdopen(fd, 'wb') as cache_file:
+                        cache_file.write(payload)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+
+        sidecar = deserialize_frame(storage.download_bytes(f"{source_stream}_text_embeddings.parquet"))
+        return np.load(path, mmap_mode='r'), sidecar
+
+    def load_dedup_index(self):
+        if self.dedup_index is None:
+            payload = self.historical_storage_manager.download_bytes(self.dedup_index_name)
+            self.dedup_index = MinHashLSHIndex.from_bytes(payload) if payload else MinHashLSHIndex()
+            # A brand-new index has seen none of the stored history; the next append seeds it
+            self._dedup_index_needs_seed = not payload
+        return self.dedup_index
 
-    def serialize_text_embeddings(self, text_embeddings, source_stream):
-        # Implementation details for serializing text embeddings to cloud storage
-        # Here, we use Pandas DataFrame to store embeddings data
-        embeddings_df = pd.DataFrame({'text': [item['text'] for item in text_embeddings],
-                                      'embeddings': [item['embeddings'] for item in text_embeddings],
-                                      'source_stream': source_stream})
+    def save_dedup_index(self):
+        # Separate from appends: writing the index is O(index), appends stay O(batch)
+        self.historical_storage_manager.upload_bytes(self.dedup_index_name, self.load_dedup_index().to_bytes())
 
-        filename = f"{source_stream}_text_embeddings.json"
-        blob_client = self.historical_storage_manager.container_client.get_blob_client(filename)
+    @classmethod
+    def _timestamp_of(cls, item):
+        # UTC timestamp used for ordering; items without one sort after everything else
+        value = item_timestamp(item)
+        if value is None or pd.isna(value):
+            return pd.Timestamp.max.tz_localize('UTC')
+        timestamp = pd.Timestamp(value)
+        return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
 
-        # Convert the DataFrame to a JSON string
-        embeddings_json_str = embeddings_df.to_json(orient='records', lines=True)
+    @staticmethod
+    def _dedup_text(item):
+        return item.get('text') or ' '.join(filter(None, [item.get('title'), item.get('description')]))
 
-        # Upload the JSON string to the cloud storage
-        blob_client.upload_blob(embeddings_json_str, overwrite=True)
+    def _seed_dedup_index(self, index, existing_data):
+        # With no persisted index, the most recent rows of the history stand in for it, so a first
+        # append cannot re-add text that is already stored
+        for item in existing_data[-index.max_documents:]:
+            index.add_if_new(self._dedup_text(item))
+        self._dedup_index_needs_seed = False
 
     def append_streams_chronologically(self, existing_data, new_data):
-        # Implementation details for appending streams chronologically
-        # Here, we use Pandas DataFrame for simplicity
-        existing_df = pd.DataFrame(existing_data)
-        new_df = pd.DataFrame(new_data)
+        # Returns (start, merged_tail): the stream with existing_data[start:] replaced by merged_tail
+        # (a list of dicts) is time-ordered, e.g. `rows[start:] = merged_tail` for a list.
+        # existing_data, a list of items or a DataFrame, is not modified and must already be
+        # time-ordered. New items are checked against the MinHash/LSH index and only the stretch of
+        # history they overlap is read and merged, so the cost scales with the batch, not the history.
+        # Items are never hashed as a whole, so rows carrying list/array embeddings are fine.
+        index = self.load_dedup_index()
+        if isinstance(existing_data, pd.DataFrame):
+            existing_data = _FrameRecords(existing_data)
+        if isinstance(new_data, pd.DataFrame):
+            new_data = new_data.to_dict(orient='records')
+        if self._dedup_index_needs_seed:
+            self._seed_dedup_index(index, existing_data)
 
-        updated_df = pd.concat([existing_df, new_df]).drop_duplicates()
+        fresh = sorted((item for item in new_data if index.add_if_new(self._dedup_text(item))),
+                       key=self._timestamp_of)
+        if not fresh:
+            return len(existing_data), []
 
-        return updated_df.to_dict(orient='records')
\ No newline at end of file
+        start = bisect.bisect_right(existing_data, self._timestamp_of(fresh[0]), key=self._timestamp_of)
+        return start, list(heapq.merge(existing_data[start:], fresh, key=self._timestamp_of))
\ No newline at end of file
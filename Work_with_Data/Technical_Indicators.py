@@ -1,11 +1,493 @@
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+# matplotlib is imported by the plotting methods only, so headless indicator jobs never load it
 from Data_gathering.Historical_Pricing import DataStorageManager  
 
+class IndicatorEngine:
+    INDICATORS = ['sma', 'ema', 'bollinger', 'rsi', 'macd', 'atr']
+
+    def __init__(self, pricing_data, block_size=64):
+        # pricing_data: long frame with 'instrument', 'date', 'close' (and 'high'/'low' for ATR)
+        self.pricing_data = pricing_data
+        self.block_size = block_size
+
+        # Sort and group once: every instrument becomes one row of an (instruments x bars) matrix,
+        # so each indicator is a vectorized pass along axis 1 that never crosses instrument boundaries
+        codes, self.instruments = pd.factorize(pricing_data['instrument'], sort=True)
+        date_codes = pd.factorize(pricing_data['date'], sort=True)[0]
+        self.order = np.lexsort((date_codes, codes))
+        sorted_codes = codes[self.order]
+        self.lengths = np.bincount(sorted_codes, minlength=len(self.instruments))
+        starts = np.concatenate([[0], np.cumsum(self.lengths)[:-1]])
+        self.rows = sorted_codes
+        self.cols = np.arange(len(sorted_codes)) - starts[sorted_codes]
+        self.shape = (len(self.instruments), int(self.lengths.max()) if len(self.lengths) else 0)
+        self._matrices = {}
+
+    def _matrix(self, column):
+        if column not in self._matrices:
+            if column not in self.pricing_data.columns:
+                raise ValueError(f"Pricing data has no '{column}' column.")
+            matrix = np.full(self.shape, np.nan)
+            matrix[self.rows, self.cols] = self.pricing_data[column].to_numpy(dtype='float64')[self.order]
+            self._matrices[column] = matrix
+        return self._matrices[column]
+
+    def _to_long(self, matrix):
+        # Scatter matrix cells back to the row order of the original pricing_data
+        values = np.empty(len(self.rows))
+        values[self.order] = matrix[self.rows, self.cols]
+        return values
+
+    def _prefix_sums(self, matrix):
+        # One prefix sum per row serves every window length; values are centred on the row's
+        # first value so long histories do not lose precision to cancellation
+        base = np.nan_to_num(matrix[:, :1])
+        nan_mask = np.isnan(matrix)
+        centred = np.where(nan_mask, 0.0, matrix - base)
+        return base, np.cumsum(centred, axis=1), np.cumsum(nan_mask, axis=1)
+
+    def _window_sums(self, prefix, window):
+        base, sums, nans = prefix
+        sums, nans = sums.copy(), nans.copy()
+        if window < sums.shape[1]:
+            sums[:, window:] -= prefix[1][:, :-window]
+            nans[:, window:] -= prefix[2][:, :-window]
+        valid = (np.arange(sums.shape[1]) >= window - 1) & (nans == 0)
+        return base, sums, valid
+
+    def _rolling_sums(self, matrix, window):
+        return self._window_sums(self._prefix_sums(matrix), window)
+
+    def _sma(self, matrix, window, prefix=None):
+        base, sums, valid = self._window_sums(prefix or self._prefix_sums(matrix), window)
+        return np.where(valid, base + sums / window, np.nan)
+
+    def _rolling_std(self, matrix, window, block_size=1024):
+        # Sample standard deviation per window. Sums of squares cancel badly once prices drift far
+        # from a global anchor, so they are taken per block of bars (plus the window reaching back
+        # into the previous block), centred on that stretch's own mean
+        result = np.full(matrix.shape, np.nan)
+        if window < 2:
+            return result
+        nan_mask = np.isnan(matrix)
+        zeros = np.zeros((matrix.shape[0], 1))
+        for start in range(0, matrix.shape[1], block_size):
+            end = min(start + block_size, matrix.shape[1])
+            lo = max(start - window + 1, 0)
+            missing = nan_mask[:, lo:end]
+            present = np.where(missing, 0.0, matrix[:, lo:end])
+            anchor = present.sum(axis=1, keepdims=True) / np.maximum((~missing).sum(axis=1, keepdims=True), 1)
+            centred = np.where(missing, 0.0, present - anchor)
+            sums = np.concatenate([zeros, np.cumsum(centred, axis=1)], axis=1)
+            squares = np.concatenate([zeros, np.cumsum(centred ** 2, axis=1)], axis=1)
+            nans = np.concatenate([zeros, np.cumsum(missing, axis=1)], axis=1)
+
+            # The window ending at bar t spans prefix positions (t - lo + 1 - window, t - lo + 1]
+            ends = np.arange(start, end) - lo + 1
+            begins = np.maximum(ends - window, 0)
+            window_sums = sums[:, ends] - sums[:, begins]
+            variance = np.clip((squares[:, ends] - squares[:, begins] - window_sums ** 2 / window) / (window - 1),
+                               0.0, None)
+            valid = (ends >= window) & (nans[:, ends] - nans[:, begins] == 0)
+            result[:, start:end] = np.where(valid, np.sqrt(variance), np.nan)
+        return result
+
+    def _ema(self, matrix, alpha):
+        # y[t] = alpha * x[t] + (1 - alpha) * y[t-1], seeded with the first value (pandas adjust=False).
+        # The recursion is unrolled over blocks of bars so each step is one matrix product over all instruments.
+        filled = self._forward_fill(matrix)
+        beta = 1.0 - alpha
+        steps = np.arange(self.block_size)
+        weights = np.tril(alpha * beta ** np.clip(steps[:, None] - steps[None, :], 0, None))
+        carry_weights = beta ** (steps + 1)
+
+        result = np.empty_like(filled)
+        previous = filled[:, 0].copy() if filled.shape[1] else np.empty(0)
+        for start in range(0, filled.shape[1], self.block_size):
+            block = filled[:, start:start + self.block_size]
+            width = block.shape[1]
+            values = block @ weights[:width, :width].T + previous[:, None] * carry_weights[:width]
+            result[:, start:start + width] = values
+            previous = values[:, -1]
+        return np.where(np.isnan(matrix), np.nan, result)
+
+    def _forward_fill(self, matrix):
+        # Gaps inside a series carry the last price; padding after the last bar is never read back
+        positions = np.where(np.isnan(matrix), 0, np.arange(matrix.shape[1]))
+        np.maximum.accumulate(positions, axis=1, out=positions)
+        return np.nan_to_num(matrix[np.arange(matrix.shape[0])[:, None], positions])
+
+    def _previous(self, matrix):
+        shifted = np.full(matrix.shape, np.nan)
+        shifted[:, 1:] = matrix[:, :-1]
+        return shifted
+
+    def _rsi(self, close, window, smoothing):
+        delta = close - self._previous(close)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        if smoothing == 'wilder':
+            avg_gain = self._ema(gain, 1.0 / window)
+            avg_loss = self._ema(loss, 1.0 / window)
+        else:
+            # Simple rolling mean with min_periods=1, as the original RelativeStrengthIndex did
+            _, gain_sums, _ = self._rolling_sums(gain, window)
+            _, loss_sums, _ = self._rolling_sums(loss, window)
+            periods = np.minimum(np.arange(close.shape[1]) + 1, window)
+            avg_gain = gain_sums / periods
+            avg_loss = loss_sums / periods
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_gain / avg_loss
+            return 100 - (100 / (1 + rs))
+
+    def _atr(self, window):
+        high, low, close = self._matrix('high'), self._matrix('low'), self._matrix('close')
+        previous_close = self._previous(close)
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+        return self._ema(true_range, 1.0 / window)
+
+    def compute(self, indicators):
+        # indicators: list of (name, params) pairs, e.g.
+        # [('sma', {'window': 20}), ('bollinger', {'lookback_period': 20, 'deviation': 2}), ('rsi', {'window': 14})]
+        close = self._matrix('close')
+        columns = {}
+        for name, params in indicators:
+            if name == 'sma':
+                window = params['window']
+                columns[f'sma_{window}'] = self._sma(close, window)
+            elif name == 'ema':
+                span = params['span']
+                columns[f'ema_{span}'] = self._ema(close, 2.0 / (span + 1))
+            elif name == 'bollinger':
+                lookback, deviation = params['lookback_period'], params['deviation']
+                middle = self._sma(close, lookback)
+                std = self._rolling_std(close, lookback)
+                suffix = f'{lookback}_{deviation:g}'
+                columns[f'bb_middle_{suffix}'] = middle
+                columns[f'bb_upper_{suffix}'] = middle + deviation * std
+                columns[f'bb_lower_{suffix}'] = middle - deviation * std
+            elif name == 'rsi':
+                window, smoothing = params['window'], params.get('smoothing', 'wilder')
+                columns[f'rsi_{smoothing}_{window}'] = self._rsi(close, window, smoothing)
+            elif name == 'macd':
+                fast, slow, signal = params.get('fast', 12), params.get('slow', 26), params.get('signal', 9)
+                macd = self._ema(close, 2.0 / (fast + 1)) - self._ema(close, 2.0 / (slow + 1))
+                signal_line = self._ema(macd, 2.0 / (signal + 1))
+                suffix = f'{fast}_{slow}_{signal}'
+                columns[f'macd_{suffix}'] = macd
+                columns[f'macd_signal_{suffix}'] = signal_line
+                columns[f'macd_hist_{suffix}'] = macd - signal_line
+            elif name == 'atr':
+                window = params['window']
+                columns[f'atr_{window}'] = self._atr(window)
+            else:
+                raise ValueError(f"Unknown indicator: {name}. Expected one of {self.INDICATORS}.")
+
+        # One wide frame aligned row-for-row with pricing_data
+        result = pd.DataFrame({'instrument': self.pricing_data['instrument'].to_numpy(),
+                               'date': self.pricing_data['date'].to_numpy()}, index=self.pricing_data.index)
+        for column, matrix in columns.items():
+            result[column] = self._to_long(matrix)
+        return result
+
+def _sweep_chunk(pricing_data, indicator_type, parameter_values, deviation, dtype):
+    # Worker for IndicatorSweep; module level so a process pool can pickle it
+    engine = IndicatorEngine(pricing_data)
+    close = engine._matrix('close')
+    prefix = engine._prefix_sums(close) if indicator_type in ('sma', 'bollinger_upper', 'bollinger_lower') else None
+    sweep = np.empty((close.shape[0], len(parameter_values), close.shape[1]), dtype=dtype)
+
+    for k, value in enumerate(parameter_values):
+        if indicator_type == 'sma':
+            values = engine._sma(close, value, prefix)
+        elif indicator_type == 'ema':
+            values = engine._ema(close, 2.0 / (value + 1))
+        elif indicator_type == 'std':
+            values = engine._rolling_std(close, value)
+        elif indicator_type in ('bollinger_upper', 'bollinger_lower'):
+            sign = 1.0 if indicator_type == 'bollinger_upper' else -1.0
+            values = engine._sma(close, value, prefix) + sign * deviation * engine._rolling_std(close, value)
+        else:
+            values = engine._rsi(close, value, 'wilder')
+        sweep[:, k, :] = values
+
+    dates = pricing_data['date'].to_numpy()[engine.order]
+    starts = np.concatenate([[0], np.cumsum(engine.lengths)[:-1]])
+    results = {}
+    for row, instrument in enumerate(engine.instruments):
+        length = engine.lengths[row]
+        instrument_dates = dates[starts[row]:starts[row] + length]
+        results[instrument] = pd.DataFrame(sweep[row, :, :length], index=list(parameter_values),
+                                           columns=instrument_dates)
+    return results
+
+class IndicatorSweep:
+    SWEEPABLE = ['sma', 'ema', 'std', 'bollinger_upper', 'bollinger_lower', 'rsi']
+
+    def __init__(self, pricing_data, max_workers=None, instruments_per_task=100, dtype=np.float32):
+        self.pricing_data = pricing_data
+        self.max_workers = max_workers
+        self.instruments_per_task = instruments_per_task
+        # float32 halves the (instrument x parameter x time) output, which dominates memory on large sweeps
+        self.dtype = dtype
+
+    def run(self, indicator_type, parameter_range, deviation=2):
+        # Returns {instrument: DataFrame(parameter x date)} for every value in parameter_range
+        if indicator_type not in self.SWEEPABLE:
+            raise ValueError(f"Cannot sweep {indicator_type}. Expected one of {self.SWEEPABLE}.")
+        parameter_values = list(parameter_range)
+        if not parameter_values or min(parameter_values) <= 0:
+            raise ValueError("Parameter values must be greater than 0.")
+        # An EMA span may be fractional; every other sweep takes a window length in bars
+        if indicator_type == 'ema':
+            parameter_values = [float(value) for value in parameter_values]
+        else:
+            if any(float(value) != int(value) for value in parameter_values):
+                raise ValueError(f"{indicator_type} windows must be whole numbers of bars, got {parameter_values}.")
+            parameter_values = [int(value) for value in parameter_values]
+
+        instruments = self.pricing_data['instrument'].unique()
+        chunks = [instruments[i:i + self.instruments_per_task]
+                  for i in range(0, len(instruments), self.instruments_per_task)]
+        tasks = [self.pricing_data[self.pricing_data['instrument'].isin(chunk)] for chunk in chunks]
+
+        results = {}
+        if self.max_workers == 1 or len(tasks) <= 1:
+            for task in tasks:
+                results.update(_sweep_chunk(task, indicator_type, parameter_values, deviation, self.dtype))
+            return results
+
+        # Instruments are independent, so chunks of them spread across processes
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(_sweep_chunk, task, indicator_type, parameter_values, deviation, self.dtype)
+                       for task in tasks]
+            for future in futures:
+                results.update(future.result())
+        return results
+
+class StreamingIndicators:
+    def __init__(self, indicators):
+        # indicators: the same (name, params) list IndicatorEngine.compute takes
+        for name, _ in indicators:
+            if name not in IndicatorEngine.INDICATORS:
+                raise ValueError(f"Unknown indicator: {name}. Expected one of {IndicatorEngine.INDICATORS}.")
+        self.indicators = [(name, dict(params)) for name, params in indicators]
+
+        windows = [params['window'] for name, params in self.indicators if name == 'sma']
+        windows += [params['lookback_period'] for name, params in self.indicators if name == 'bollinger']
+        rsi_windows = [params['window'] for name, params in self.indicators
+                       if name == 'rsi' and params.get('smoothing', 'wilder') != 'wilder']
+        self.windows = sorted(set(windows))
+        self.rsi_windows = sorted(set(rsi_windows))
+        # Ring buffers only need to hold the longest window
+        self.buffer_size = max(self.windows + self.rsi_windows + [1])
+        # instrument -> compact state of plain floats and lists, so it serializes to JSON as-is
+        self.states = {}
+
+    def _new_state(self, close):
+        return {
+            'count': 0,
+            'base': close,
+            'last_close': None,
+            'last_date': None,
+            # Everything the latest bar changed, so a revised version of it can replace it
+            'previous': None,
+            'closes': [0.0] * self.buffer_size,
+            'gains': [0.0] * self.buffer_size,
+            'losses': [0.0] * self.buffer_size,
+            'sums': {str(w): 0.0 for w in self.windows},
+            'squares': {str(w): 0.0 for w in self.windows},
+            'gain_sums': {str(w): 0.0 for w in self.rsi_windows},
+            'loss_sums': {str(w): 0.0 for w in self.rsi_windows},
+            'ema': {},
+        }
+
+    def _ema_update(self, state, key, value, alpha):
+        # Seeded with the first value, like IndicatorEngine._ema (pandas adjust=False)
+        previous = state['ema'].get(key)
+        state['ema'][key] = value if previous is None else alpha * value + (1.0 - alpha) * previous
+        return state['ema'][key]
+
+    _REVISABLE = ('sums', 'squares', 'gain_sums', 'loss_sums', 'ema')
+
+    def _snapshot(self, state):
+        slot = state['count'] % self.buffer_size
+        snapshot = {key: dict(state[key]) for key in self._REVISABLE}
+        snapshot.update(count=state['count'], last_close=state['last_close'], last_date=state['last_date'],
+                        slot=[state['closes'][slot], state['gains'][slot], state['losses'][slot]])
+        return snapshot
+
+    def _restore(self, state, snapshot):
+        slot = snapshot['count'] % self.buffer_size
+        state['closes'][slot], state['gains'][slot], state['losses'][slot] = snapshot['slot']
+        for key in self._REVISABLE:
+            state[key] = dict(snapshot[key])
+        state['count'] = snapshot['count']
+        state['last_close'] = snapshot['last_close']
+        state['last_date'] = snapshot['last_date']
+
+    def _rebase(self, state, close):
+        # Re-centres the ring buffer and window sums on close. Done once per buffer length, so the sums
+        # of squares stay near the current price level instead of growing with the drift since the first bar
+        shift = close - state['base']
+        state['base'] = close
+        state['closes'] = [value - shift for value in state['closes']]
+        n = state['count']
+        for w in self.windows:
+            recent = [state['closes'][(n - 1 - k) % self.buffer_size] for k in range(min(n, w))]
+            state['sums'][str(w)] = sum(recent)
+            state['squares'][str(w)] = sum(value * value for value in recent)
+
+    @staticmethod
+    def _date_key(date):
+        # Bar date as int64 nanoseconds (UTC when tz-aware), so saved state stays JSON and comparable
+        timestamp = pd.Timestamp(date)
+        return (timestamp.tz_convert('UTC') if timestamp.tzinfo else timestamp).value
+
+    def update(self, instrument, date, close, high=None, low=None):
+        # Append one bar and return every configured indicator for it in constant time.
+        # A bar with the latest bar's date revises it (e.g. an intraday refresh of today's bar):
+        # the latest bar's effect is undone first, so only the newest version counts.
+        # A bar older than the latest one is rejected
+        state = self.states.get(instrument)
+        if state is None:
+            state = self.states[instrument] = self._new_state(close)
+        date_key = self._date_key(date)
+        if state['last_date'] is not None:
+            last_date = state['last_date']
+            if isinstance(last_date, str):
+                last_date = state['last_date'] = self._date_key(last_date)
+            if date_key == last_date:
+                if state.get('previous') is None:
+                    raise ValueError(f"The saved state for {instrument} cannot revise its bar at {date}.")
+                self._restore(state, state['previous'])
+            elif date_key < last_date:
+                raise ValueError(f"Bar for {instrument} at {date} is older than the last one processed "
+                                 f"({pd.Timestamp(last_date)}).")
+        if self.windows and state['count'] and state['count'] % self.buffer_size == 0:
+            self._rebase(state, close)
+        state['previous'] = self._snapshot(state)
+
+        n = state['count']
+        slot = n % self.buffer_size
+        centred = close - state['base']
+
+        # Rolling sums of centred closes: add the new bar, drop the one leaving each window
+        for w in self.windows:
+            key = str(w)
+            state['sums'][key] += centred
+            state['squares'][key] += centred * centred
+            if n >= w:
+                leaving = state['closes'][(n - w) % self.buffer_size]
+                state['sums'][key] -= leaving
+                state['squares'][key] -= leaving * leaving
+
+        previous_close = state['last_close']
+        delta = 0.0 if previous_close is None else close - previous_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        for w in self.rsi_windows:
+            key = str(w)
+            state['gain_sums'][key] += gain
+            state['loss_sums'][key] += loss
+            if n >= w:
+                state['gain_sums'][key] -= state['gains'][(n - w) % self.buffer_size]
+                state['loss_sums'][key] -= state['losses'][(n - w) % self.buffer_size]
+
+        state['closes'][slot] = centred
+        state['gains'][slot] = gain
+        state['losses'][slot] = loss
+        state['count'] = n + 1
+        state['last_close'] = close
+        state['last_date'] = date_key
+
+        values = {}
+        for name, params in self.indicators:
+            if name == 'sma':
+                w = params['window']
+                values[f'sma_{w}'] = state['base'] + state['sums'][str(w)] / w if n + 1 >= w else math.nan
+            elif name == 'ema':
+                span = params['span']
+                values[f'ema_{span}'] = self._ema_update(state, f'ema_{span}', close, 2.0 / (span + 1))
+            elif name == 'bollinger':
+                w, deviation = params['lookback_period'], params['deviation']
+                suffix = f'{w}_{deviation:g}'
+                if n + 1 >= w:
+                    total, squares = state['sums'][str(w)], state['squares'][str(w)]
+                    middle = state['base'] + total / w
+                    std = math.sqrt(max((squares - total * total / w) / (w - 1), 0.0)) if w > 1 else math.nan
+                else:
+                    middle = std = math.nan
+                values[f'bb_middle_{suffix}'] = middle
+                values[f'bb_upper_{suffix}'] = middle + deviation * std
+                values[f'bb_lower_{suffix}'] = middle - deviation * std
+            elif name == 'rsi':
+                w = params['window']
+                if params.get('smoothing', 'wilder') == 'wilder':
+                    avg_gain = self._ema_update(state, f'rsi_gain_{w}', gain, 1.0 / w)
+                    avg_loss = self._ema_update(state, f'rsi_loss_{w}', loss, 1.0 / w)
+                else:
+                    periods = min(n + 1, w)
+                    avg_gain = state['gain_sums'][str(w)] / periods
+                    avg_loss = state['loss_sums'][str(w)] / periods
+                values[f"rsi_{params.get('smoothing', 'wilder')}_{w}"] = self._rsi_value(avg_gain, avg_loss)
+            elif name == 'macd':
+                fast, slow, signal = params.get('fast', 12), params.get('slow', 26), params.get('signal', 9)
+                suffix = f'{fast}_{slow}_{signal}'
+                macd = (self._ema_update(state, f'macd_fast_{suffix}', close, 2.0 / (fast + 1)) -
+                        self._ema_update(state, f'macd_slow_{suffix}', close, 2.0 / (slow + 1)))
+                signal_line = self._ema_update(state, f'macd_signal_{suffix}', macd, 2.0 / (signal + 1))
+                values[f'macd_{suffix}'] = macd
+                values[f'macd_signal_{suffix}'] = signal_line
+                values[f'macd_hist_{suffix}'] = macd - signal_line
+            elif name == 'atr':
+                if high is None or low is None:
+                    raise ValueError("ATR needs high and low prices.")
+                w = params['window']
+                true_range = high - low
+                if previous_close is not None:
+                    true_range = max(true_range, abs(high - previous_close), abs(low - previous_close))
+                values[f'atr_{w}'] = self._ema_update(state, f'atr_{w}', true_range, 1.0 / w)
+        return values
+
+    def _rsi_value(self, avg_gain, avg_loss):
+        # Same edge cases as the vectorized division: 0/0 -> NaN, x/0 -> 100
+        if avg_loss == 0:
+            return math.nan if avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def update_frame(self, new_data):
+        # Feed a frame of new bars (instrument, date, close[, high, low]) in date order;
+        # returns one row of indicator values per bar, aligned with new_data
+        ordered = new_data.sort_values('date', kind='stable')
+        has_range = 'high' in ordered.columns and 'low' in ordered.columns
+        rows = {}
+        for index, bar in zip(ordered.index, ordered.itertuples(index=False)):
+            rows[index] = self.update(bar.instrument, bar.date, bar.close,
+                                      bar.high if has_range else None, bar.low if has_range else None)
+        result = pd.DataFrame.from_dict(rows, orient='index').reindex(new_data.index)
+        result.insert(0, 'date', new_data['date'])
+        result.insert(0, 'instrument', new_data['instrument'])
+        return result
+
+    def to_json(self):
+        return json.dumps({'indicators': self.indicators, 'states': self.states})
+
+    @classmethod
+    def from_json(cls, payload):
+        saved = json.loads(payload)
+        streaming = cls([(name, params) for name, params in saved['indicators']])
+        streaming.states = saved['states']
+        return streaming
+
 class MovingAverages:
-    def __init__(self, pricing_data):
+    def __init__(self, pricing_data, storage_manager: DataStorageManager = None):
         self.pricing_data = pricing_data
+        self.storage_manager = storage_manager
         self.ma_data = None
 
     def compute_simple_moving_average(self, window_length):
@@ -14,8 +496,8 @@ class MovingAverages:
             raise ValueError("Window length must be greater than 0.")
         
         # Implementation details for computing simple moving average
-        self.ma_data = self.pricing_data.groupby('instrument')['close'].rolling(window=window_length).mean().reset_index()
-        self.ma_data = self.ma_data.rename(columns={'close': 'simple_moving_average'})
+        self.ma_data = IndicatorEngine(self.pricing_data).compute([('sma', {'window': window_length})])
+        self.ma_data = self.ma_data.rename(columns={f'sma_{window_length}': 'simple_moving_average'})
 
     def compute_exponential_moving_average(self, span):
         # Validate span
@@ -23,16 +505,19 @@ class MovingAverages:
             raise ValueError("Span must be greater than 0.")
         
         # Implementation details for computing exponential moving average
-        self.ma_data = self.pricing_data.groupby('instrument')['close'].ewm(span=span, adjust=False).mean().reset_index()
-        self.ma_data = self.ma_data.rename(columns={'close': 'exponential_moving_average'})
+        self.ma_data = IndicatorEngine(self.pricing_data).compute([('ema', {'span': span})])
+        self.ma_data = self.ma_data.rename(columns={f'ema_{span}': 'exponential_moving_average'})
 
     def output_ma_time_series(self):
         # Implementation details for serializing MA time series
-        DataStorageManager.serialize_to_cloud_storage(self.ma_data, 'ma_time_series.json')
+        if self.storage_manager is None:
+            raise ValueError("A storage_manager is needed to output the time series.")
+        self.storage_manager.serialize_to_cloud_storage(self.ma_data, 'ma_time_series.json')
 
 class BollingerBands:
-    def __init__(self, pricing_data):
+    def __init__(self, pricing_data, storage_manager: DataStorageManager = None):
         self.pricing_data = pricing_data
+        self.storage_manager = storage_manager
         self.bb_data = None
 
     def compute_bollinger_bands(self, lookback_period, deviation):
@@ -41,48 +526,42 @@ class BollingerBands:
             raise ValueError("Lookback period and deviation must be greater than 0.")
         
         # Implementation details for computing Bollinger Bands
-        ma = self.pricing_data.groupby('instrument')['close'].rolling(window=lookback_period).mean().reset_index()
-        std = self.pricing_data.groupby('instrument')['close'].rolling(window=lookback_period).std().reset_index()
-
-        upper_band = ma['close'] + deviation * std['close']
-        lower_band = ma['close'] - deviation * std['close']
+        bands = IndicatorEngine(self.pricing_data).compute(
+            [('bollinger', {'lookback_period': lookback_period, 'deviation': deviation})])
+        suffix = f'{lookback_period}_{deviation:g}'
 
         self.bb_data = pd.DataFrame({
-            'instrument': self.pricing_data['instrument'],
-            'date': self.pricing_data['date'],
-            'upper_band': upper_band,
-            'lower_band': lower_band
+            'instrument': bands['instrument'],
+            'date': bands['date'],
+            'upper_band': bands[f'bb_upper_{suffix}'],
+            'lower_band': bands[f'bb_lower_{suffix}']
         })
 
     def output_bb_time_series(self):
         # Implementation details for serializing Bollinger Bands time series
-        DataStorageManager.serialize_to_cloud_storage(self.bb_data, 'bb_time_series.json')
+        if self.storage_manager is None:
+            raise ValueError("A storage_manager is needed to output the time series.")
+        self.storage_manager.serialize_to_cloud_storage(self.bb_data, 'bb_time_series.json')
 
 class RelativeStrengthIndex:
-    def __init__(self, pricing_data):
+    def __init__(self, pricing_data, storage_manager: DataStorageManager = None):
         self.pricing_data = pricing_data
+        self.storage_manager = storage_manager
         self.rsi_data = None
 
-    def calculate_rsi(self, window, overbought_threshold, oversold_threshold):
+    def calculate_rsi(self, window, overbought_threshold, oversold_threshold, smoothing='sma'):
         # Validate window
         if window <= 0:
             raise ValueError("Window must be greater than 0.")
 
         # Implementation details for calculating Relative Strength Index
-        delta = self.pricing_data.groupby('instrument')['close'].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-
-        avg_gain = gain.rolling(window=window, min_periods=1).mean()
-        avg_loss = loss.rolling(window=window, min_periods=1).mean()
-
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
+        # smoothing='sma' keeps the rolling-mean RSI, 'wilder' uses Wilder's exponential averages
+        rsi = IndicatorEngine(self.pricing_data).compute([('rsi', {'window': window, 'smoothing': smoothing})])
 
         self.rsi_data = pd.DataFrame({
-            'instrument': self.pricing_data['instrument'],
-            'date': self.pricing_data['date'],
-            'rsi': rsi
+            'instrument': rsi['instrument'],
+            'date': rsi['date'],
+            'rsi': rsi[f'rsi_{smoothing}_{window}']
         })
 
         # Mark overbought and oversold conditions
@@ -95,7 +574,81 @@ class RelativeStrengthIndex:
 
     def output_rsi_time_series(self):
         # Implementation details for serializing RSI time series
-        DataStorageManager.serialize_to_cloud_storage(self.rsi_data, 'rsi_time_series.json')
+        if self.storage_manager is None:
+            raise ValueError("A storage_manager is needed to output the time series.")
+        self.storage_manager.serialize_to_cloud_storage(self.rsi_data, 'rsi_time_series.json')
+
+def lttb_downsample(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and, per bucket, the point
+    # forming the largest triangle with the previous pick and the next bucket's mean
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:max(next_end, next_start + 1)].mean()
+        next_y = y[next_start:max(next_end, next_start + 1)].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def minmax_downsample(y, n_buckets):
+    # Per-pixel min/max: keeps both extremes of every bucket, so spikes survive downsampling
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+
+    bucket_length = -(-n // n_buckets)
+    padded = np.full(n_buckets * bucket_length, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, bucket_length)
+    offsets = np.arange(n_buckets) * bucket_length
+    valid = ~np.all(np.isnan(buckets), axis=1)
+    lows = offsets[valid] + np.nanargmin(buckets[valid], axis=1)
+    highs = offsets[valid] + np.nanargmax(buckets[valid], axis=1)
+    return np.unique(np.concatenate([lows, highs]))
+
+def downsample_series(dates, values, width_px, method='lttb'):
+    # Reduce a (date, value) series to roughly one point per horizontal pixel
+    dates = np.asarray(dates)
+    values = np.asarray(values, dtype='float64')
+    keep = ~np.isnan(values)
+    dates, values = dates[keep], values[keep]
+    if method == 'lttb':
+        x = pd.to_datetime(dates).to_numpy(dtype='datetime64[ns]').astype('int64').astype('float64')
+        selected = lttb_downsample(x, values, width_px)
+    elif method == 'minmax':
+        selected = minmax_downsample(values, width_px)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}. Expected 'lttb' or 'minmax'.")
+    return dates[selected], values[selected]
+
+def _render_overlay_chart(output_path, instrument, indicator_type, price_dates, prices, indicator_dates,
+                          indicator_values, width_px, height_px, dpi, method):
+    # Module level so VisualVerifier.render_batch_report can run it in worker processes.
+    # Uses a bare Figure (Agg/SVG canvas) rather than pyplot, so no display is ever needed.
+    price_dates, prices = downsample_series(price_dates, prices, width_px, method)
+    indicator_dates, indicator_values = downsample_series(indicator_dates, indicator_values, width_px, method)
+
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=(width_px / dpi, height_px / dpi), dpi=dpi)
+    axes = figure.subplots()
+    axes.plot(price_dates, prices, label='Raw Price', color='blue', linewidth=0.8)
+    axes.plot(indicator_dates, indicator_values, label=indicator_type, color='orange', linewidth=0.8)
+    axes.set_title(f'{instrument} - {indicator_type} Overlay')
+    axes.set_xlabel('Date')
+    axes.set_ylabel('Value')
+    axes.legend()
+    figure.savefig(output_path)
+    return output_path
 
 class VisualVerifier:
     def __init__(self, pricing_data, technical_indicator_data):
@@ -111,6 +664,7 @@ class VisualVerifier:
             (self.technical_indicator_data['indicator_type'] == indicator_type)
         ]
 
+        import matplotlib.pyplot as plt
         plt.figure(figsize=(10, 6))
         plt.plot(instrument_data['date'], instrument_data['close'], label='Raw Price', color='blue')
         plt.plot(indicator_data['date'], indicator_data['value'], label=indicator_type, color='orange')
@@ -120,19 +674,72 @@ class VisualVerifier:
         plt.legend()
         plt.show()
 
-    def assist_parameter_tuning(self, indicator_type, parameter_range):
+    @staticmethod
+    def _overlay_series(instrument_data, indicator_data):
+        return (instrument_data['date'].to_numpy(), instrument_data['close'].to_numpy(),
+                indicator_data['date'].to_numpy(), indicator_data['value'].to_numpy())
+
+    def render_overlay(self, instrument, indicator_type, output_path, width_px=1200, height_px=600, dpi=100,
+                       method='lttb'):
+        # Headless counterpart of plot_overlay: series are downsampled to the pixel budget and the
+        # chart is written to output_path (.png or .svg) instead of being shown
+        instrument_data = self.pricing_data[self.pricing_data['instrument'] == instrument]
+        indicator_data = self.technical_indicator_data[
+            (self.technical_indicator_data['instrument'] == instrument) &
+            (self.technical_indicator_data['indicator_type'] == indicator_type)
+        ]
+        return _render_overlay_chart(output_path, instrument, indicator_type,
+                                     *self._overlay_series(instrument_data, indicator_data),
+                                     width_px, height_px, dpi, method)
+
+    def render_batch_report(self, instruments, indicator_type, output_dir, file_format='png', max_workers=None,
+                            width_px=1200, height_px=600, dpi=100, method='lttb'):
+        # Render one overlay chart per instrument in parallel; returns {instrument: chart path}
+        if file_format not in ('png', 'svg'):
+            raise ValueError("file_format must be 'png' or 'svg'.")
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Split both frames by instrument once rather than scanning them again for every chart
+        indicator_data = self.technical_indicator_data[self.technical_indicator_data['indicator_type'] == indicator_type]
+        price_groups = dict(tuple(self.pricing_data.groupby('instrument', sort=False)))
+        indicator_groups = dict(tuple(indicator_data.groupby('instrument', sort=False)))
+        empty_prices, empty_indicator = self.pricing_data.iloc[:0], indicator_data.iloc[:0]
+
+        jobs = {instrument: (os.path.join(output_dir, f'{instrument}_{indicator_type}.{file_format}'), instrument,
+                             indicator_type,
+                             *self._overlay_series(price_groups.get(instrument, empty_prices),
+                                                   indicator_groups.get(instrument, empty_indicator)),
+                             width_px, height_px, dpi, method)
+                for instrument in instruments}
+        if max_workers == 1:
+            return {instrument: _render_overlay_chart(*job) for instrument, job in jobs.items()}
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {instrument: pool.submit(_render_overlay_chart, *job) for instrument, job in jobs.items()}
+            return {instrument: future.result() for instrument, future in futures.items()}
+
+    def assist_parameter_tuning(self, indicator_type, parameter_range, use_sweep=False):
         # Implementation details for assisting parameter tuning
         # Plot the indicator for different parameter values within the specified range
+        import matplotlib.pyplot as plt
+
         instrument = self.pricing_data['instrument'].iloc[0]
         plt.figure(figsize=(10, 6))
 
-        for parameter_value in parameter_range:
-            indicator_data = self.technical_indicator_data[
-                (self.technical_indicator_data['instrument'] == instrument) &
-                (self.technical_indicator_data['indicator_type'] == indicator_type) &
-                (self.technical_indicator_data['parameter'] == parameter_value)
-            ]
-            plt.plot(indicator_data['date'], indicator_data['value'], label=f'{indicator_type} - {parameter_value}')
+        if use_sweep:
+            # Compute every parameter value in one batched sweep instead of expecting precomputed series
+            instrument_data = self.pricing_data[self.pricing_data['instrument'] == instrument]
+            sweep = IndicatorSweep(instrument_data, max_workers=1).run(indicator_type, parameter_range)[instrument]
+            for parameter_value, values in sweep.iterrows():
+                plt.plot(sweep.columns, values.to_numpy(), label=f'{indicator_type} - {parameter_value}')
+        else:
+            for parameter_value in parameter_range:
+                indicator_data = self.technical_indicator_data[
+                    (self.technical_indicator_data['instrument'] == instrument) &
+                    (self.technical_indicator_data['indicator_type'] == indicator_type) &
+                    (self.technical_indicator_data['parameter'] == parameter_value)
+                ]
+                plt.plot(indicator_data['date'], indicator_data['value'], label=f'{indicator_type} - {parameter_value}')
 
         plt.title(f'{instrument} - {indicator_type} Parameter Tuning')
         plt.xlabel('Date')
@@ -148,9 +755,23 @@ class TechnicalIndicatorsDataStorageManager:
 
     def serialize_indicator_time_series(self, indicator_data: pd.DataFrame, instrument: str, indicator_type: str):
         # Implementation details for serializing indicator time series
-        DataStorageManager.serialize_to_cloud_storage(indicator_data, f'{instrument}_{indicator_type}_time_series.json')
+        self.historical_storage_manager.serialize_to_cloud_storage(indicator_data,
+                                                                  f'{instrument}_{indicator_type}_time_series.json')
 
     def support_incremental_updates(self, existing_data: pd.DataFrame, new_data: pd.DataFrame):
         # Implementation details for supporting incremental updates
         updated_data = pd.concat([existing_data, new_data]).drop_duplicates()
         return updated_data
+
+    def apply_streaming_updates(self, streaming_state: StreamingIndicators, new_data: pd.DataFrame):
+        # Constant-time-per-bar alternative to support_incremental_updates: only the new bars
+        # are touched, and the returned frame holds their indicator values
+        return streaming_state.update_frame(new_data)
+
+    def save_streaming_state(self, streaming_state: StreamingIndicators, name='indicator_state.json'):
+        self.historical_storage_manager.upload_bytes(name, streaming_state.to_json())
+
+    def load_streaming_state(self, name='indicator_state.json'):
+        # Returns None when no state has been saved yet
+        payload = self.historical_storage_manager.download_bytes(name)
+        return StreamingIndicators.from_json(payload) if payload is not None else None
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+web = pytest.importorskip('aiohttp.web')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Data_gathering import Fundamental_Data  # noqa: E402
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+class _Vendor:
+    # Stand-in fundamentals API: BAD is an unknown ticker (404), FLAKY is throttled twice before it
+    # answers; 'readonly-key' is not entitled to the endpoint and any other key is rejected
+    def __init__(self):
+        self.requests = []
+        self.flaky_failures = 2
+
+    async def fundamentals(self, request):
+        instruments = request.query['instruments'].split(',')
+        self.requests.append(instruments)
+        if request.headers['Authorization'] == 'Bearer readonly-key':
+            return web.Response(status=403)
+        if request.headers['Authorization'] != 'Bearer good-key':
+            return web.Response(status=401)
+        if 'BAD' in instruments:
+            return web.Response(status=404)
+        if 'FLAKY' in instruments and self.flaky_failures:
+            self.flaky_failures -= 1
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        return web.json_response({'data': [{'instrument': instrument, 'date': '2024-03-31', 'revenue': 1.0}
+                                           for instrument in instruments]})
+
+
+@pytest.fixture
+def vendor():
+    # aiohttp serves from its own event loop in a thread while the ingester makes blocking requests
+    vendor = _Vendor()
+    app = web.Application()
+    app.router.add_get('/fundamentals', vendor.fundamentals)
+    runner = web.AppRunner(app)
+    loop = asyncio.new_event_loop()
+    port = _free_port()
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    vendor.base_url = f'http://127.0.0.1:{port}'
+    try:
+        yield vendor
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+
+def _ingester(vendor, monkeypatch, instruments, api_key='good-key', **kwargs):
+    monkeypatch.setenv('STANDIN_API_KEY', api_key)
+    client = Fundamental_Data.FundamentalDataAPIClient('standin', base_url=vendor.base_url)
+    client.set_parameters(instruments, ['revenue'])
+    return Fundamental_Data.FundamentalDataIngester(client, backoff=0, timeout=5, **kwargs)
+
+
+def test_transient_errors_are_retried(vendor, monkeypatch):
+    ingester = _ingester(vendor, monkeypatch, ['AAPL', 'FLAKY'], max_retries=3)
+
+    records = list(ingester.iter_fundamental_records())
+
+    assert sorted(record['instrument'] for record in records) == ['AAPL', 'FLAKY']
+    assert ingester.failed_instruments == {}
+    assert len(vendor.requests) == 3
+
+
+def test_exhausted_retries_fail_only_the_chunk(vendor, monkeypatch):
+    ingester = _ingester(vendor, monkeypatch, ['AAPL', 'FLAKY'], chunk_size=1, max_workers=1, max_retries=1)
+
+    records = list(ingester.iter_fundamental_records())
+
+    assert [record['instrument'] for record in records] == ['AAPL']
+    assert set(ingester.failed_instruments) == {'FLAKY'}
+
+
+def test_rejected_chunk_is_bisected_down_to_the_bad_ticker(vendor, monkeypatch):
+    ingester = _ingester(vendor, monkeypatch, ['AAPL', 'MSFT', 'BAD', 'GOOG', 'AMZN'], chunk_size=5)
+
+    records = list(ingester.iter_fundamental_records())
+
+    assert sorted(record['instrument'] for record in records) == ['AAPL', 'AMZN', 'GOOG', 'MSFT']
+    assert set(ingester.failed_instruments) == {'BAD'}
+    assert ['BAD'] in vendor.requests
+
+
+@pytest.mark.parametrize('api_key, status', [('expired-key', 401), ('readonly-key', 403)])
+def test_auth_failure_stops_the_run_without_retrying(vendor, monkeypatch, api_key, status):
+    ingester = _ingester(vendor, monkeypatch, ['AAPL', 'MSFT', 'GOOG'], api_key=api_key, chunk_size=1,
+                         max_workers=1)
+
+    with pytest.raises(ValueError, match=str(status)):
+        list(ingester.iter_fundamental_records())
+    assert len(vendor.requests) == 1
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from Work_with_Data.Technical_Indicators import IndicatorEngine, StreamingIndicators  # noqa: E402
+
+
+def test_rolling_std_keeps_precision_on_drifting_prices():
+    bars = 300_000
+    close = np.linspace(10, 5000, bars) + np.random.default_rng(0).normal(0, 0.03, bars)
+    pricing_data = pd.DataFrame({'instrument': 'X', 'date': pd.date_range('2000-01-01', periods=bars, freq='min'),
+                                 'close': close})
+    exact = sliding_window_view(close, 20).std(axis=1, ddof=1)
+
+    bands = IndicatorEngine(pricing_data).compute([('bollinger', {'lookback_period': 20, 'deviation': 1})])
+    std = (bands['bb_upper_20_1'] - bands['bb_middle_20_1']).to_numpy()
+    np.testing.assert_allclose(std[19:], exact, rtol=1e-6)
+
+    streamed = StreamingIndicators([('bollinger', {'lookback_period': 20, 'deviation': 1})]).update_frame(pricing_data)
+    std = (streamed['bb_upper_20_1'] - streamed['bb_middle_20_1']).to_numpy()
+    np.testing.assert_allclose(std[19:], exact, rtol=1e-6)
+
+
+def test_rsi_smoothings_get_their_own_columns():
+    pricing_data = pd.DataFrame({'instrument': 'X', 'date': pd.bdate_range('2020-01-01', periods=30),
+                                 'close': 100 + np.sin(np.arange(30))})
+
+    rsi = IndicatorEngine(pricing_data).compute([('rsi', {'window': 14}), ('rsi', {'window': 14, 'smoothing': 'sma'})])
+
+    assert {'rsi_wilder_14', 'rsi_sma_14'} <= set(rsi.columns)
+    assert not np.allclose(rsi['rsi_wilder_14'], rsi['rsi_sma_14'], equal_nan=True)
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from Work_with_Data.Technical_Indicators import IndicatorEngine, StreamingIndicators  # noqa: E402
+
+INDICATORS = [('sma', {'window': 5}), ('ema', {'span': 4}), ('bollinger', {'lookback_period': 5, 'deviation': 2}),
+              ('rsi', {'window': 6}), ('rsi', {'window': 6, 'smoothing': 'sma'}), ('macd', {}),
+              ('atr', {'window': 3})]
+
+
+def _bars(instruments=3, bars=60, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (instruments, bars)), axis=1)).ravel()
+    spread = np.abs(rng.normal(0, 0.01, close.size)) * close
+    return pd.DataFrame({
+        'instrument': np.repeat([f'I{i}' for i in range(instruments)], bars),
+        'date': np.tile(pd.bdate_range('2020-01-01', periods=bars), instruments),
+        'close': close,
+        'high': close + spread,
+        'low': close - spread,
+    })
+
+
+def _assert_matches_batch(streamed, pricing_data):
+    expected = IndicatorEngine(pricing_data).compute(INDICATORS).drop(columns=['instrument', 'date'])
+    assert set(streamed.columns) - {'instrument', 'date'} == set(expected.columns)
+    for column in expected.columns:
+        np.testing.assert_allclose(streamed[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float),
+                                   rtol=1e-9, atol=1e-9, err_msg=column)
+
+
+def test_streaming_matches_batch_computation():
+    pricing_data = _bars()
+    streaming = StreamingIndicators(INDICATORS)
+
+    _assert_matches_batch(streaming.update_frame(pricing_data), pricing_data)
+
+
+def test_revised_latest_bar_matches_batch_computation():
+    pricing_data = _bars()
+    streaming = StreamingIndicators(INDICATORS)
+    streamed = {}
+    for index, bar in pricing_data.iterrows():
+        # Every bar first arrives as a stale intraday version, then is revised to its final prices
+        streaming.update(bar.instrument, bar.date, bar.close * 1.05, bar.high * 1.06, bar.low * 0.97)
+        streamed[index] = streaming.update(bar.instrument, bar.date, bar.close, bar.high, bar.low)
+    streamed = pd.DataFrame.from_dict(streamed, orient='index')
+
+    _assert_matches_batch(streamed, pricing_data)
+
+
+def test_state_round_trip_then_revision():
+    pricing_data = _bars(instruments=1, bars=30)
+    head, tail = pricing_data.iloc[:20], pricing_data.iloc[20:]
+    streaming = StreamingIndicators(INDICATORS)
+    first = streaming.update_frame(head)
+    restored = StreamingIndicators.from_json(streaming.to_json())
+    last = head.iloc[-1]
+    restored.update(last.instrument, last.date, last.close * 2, last.high * 2, last.low * 2)
+    restored.update(last.instrument, last.date, last.close, last.high, last.low)
+
+    _assert_matches_batch(pd.concat([first, restored.update_frame(tail)]), pricing_data)
+
+
+def test_older_bar_is_rejected():
+    streaming = StreamingIndicators([('sma', {'window': 2})])
+    streaming.update('X', '2020-01-02', 10.0)
+    streaming.update('X', '2020-01-03', 12.0)
+
+    with pytest.raises(ValueError):
+        streaming.update('X', '2020-01-02', 11.0)
+    assert streaming.update('X', '2020-01-03', 20.0)['sma_2'] == 15.0
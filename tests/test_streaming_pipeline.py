@@ -0,0 +1,69 @@
+import asyncio
+import os
+import socket
+import sys
+
+import numpy as np
+import pytest
+
+web = pytest.importorskip('aiohttp.web')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Data_gathering import News_SotialMedia  # noqa: E402
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+async def _news(request):
+    page = int(request.query['page'])
+    size = int(request.query['pageSize'])
+    articles = [{'title': f'AAPL <b>news</b> {page}-{i}', 'url': f'u{page}-{i}', 'description': 'desc'}
+                for i in range(size)] if page <= 3 else []
+    return web.json_response({'totalResults': 3 * size, 'articles': articles})
+
+
+async def _posts(request):
+    cursor = int(request.query.get('cursor', 0))
+    return web.json_response({'data': [{'id': f's{cursor}-{i}', 'text': f'$aapl up &amp; away {cursor}-{i}'}
+                                       for i in range(5)],
+                              'next_cursor': str(cursor + 1) if cursor < 2 else None})
+
+
+async def _collect(embed_fn, queue_size=3):
+    app = web.Application()
+    app.router.add_get('/everything', _news)
+    app.router.add_get('/posts', _posts)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = _free_port()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    try:
+        client = News_SotialMedia.NewsSocialMediaAPIClient('news-key', 'social-key')
+        client.news_base_url = client.social_media_base_url = f'http://127.0.0.1:{port}/'
+        pipeline = News_SotialMedia.StreamingIngestionPipeline(
+            client, embed_fn=embed_fn, sentiment_fn=lambda texts: [0.1] * len(texts), batch_size=4,
+            page_size=10, queue_size=queue_size)
+        return [item async for item in pipeline.stream()]
+    finally:
+        await runner.cleanup()
+
+
+def test_stream_yields_every_item_with_embeddings():
+    items = asyncio.run(asyncio.wait_for(_collect(lambda texts: np.ones((len(texts), 4), np.float32)), 10))
+
+    assert len(items) == 30 + 15
+    assert {item['source_stream'] for item in items} == {'news', 'social_media'}
+    assert all(item['embeddings'].shape == (4,) for item in items)
+    assert '<b>' not in items[0]['text']
+
+
+def test_stage_failure_reaches_the_consumer_instead_of_hanging():
+    def failing_embed(texts):
+        raise RuntimeError('embedding backend down')
+
+    with pytest.raises(RuntimeError, match='embedding backend down'):
+        asyncio.run(asyncio.wait_for(_collect(failing_embed, queue_size=1), 10))